@@ -0,0 +1,32 @@
+"""
+Gunicorn settings (picked up automatically from the working directory)
+Start with: gunicorn main:app
+"""
+
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Threaded workers: /send-reports can run for minutes while /health and
+# further triggers are still served by the other threads
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# The whole per-owner fan-out happens inside one request
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+
+# Let in-flight and background ("async": true) runs finish on restarts
+graceful_timeout = timeout
+
+# Longer than typical load balancer idle timeouts (60s) so pooled
+# connections from the proxy aren't closed under it
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+
+
+def worker_exit(server, worker):
+    # Flag background report jobs this worker never finished (they are lost if it is killed)
+    main = sys.modules.get("main")
+    if main is not None:
+        main.warn_unfinished_report_jobs()
@@ -8,20 +8,40 @@ ENHANCED: Multi-location support + User-specific scheduling
 """
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import orjson
 from supabase import create_client, Client
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from email.mime.application import MIMEApplication
+from email.charset import Charset, QP
+from email.generator import BytesGenerator
 from datetime import datetime, timedelta, timezone, time
 import os
 import re
-from typing import List, Dict, Any, Optional
+import tempfile
+import uuid
+import copy
+import csv
+import gzip
+import io
+from html import escape as html_escape
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator, Callable
+import hmac
 import logging
+import queue
+import threading
+import atexit
 import pytz
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic, sleep
 
 # Initialize Supabase client with custom options
 from supabase.lib.client_options import ClientOptions
@@ -32,11 +52,50 @@ from template1 import generate_template1_html
 from template2 import generate_template2_email as generate_template2_html
 from template3 import generate_template3_email as generate_template3_html
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Handlers only enqueue records; one listener thread
+# writes them, so pool workers never wait on the stream handler's lock.
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_queue_handler = QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # the listener adds the prefix
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
+_log_listener = QueueListener(_log_queue, _log_stream_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (jsonify and request.get_json)"""
+
+    def _option(self, sort_keys: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = self._option(kwargs.pop('sort_keys', self.sort_keys))
+        return orjson.dumps(obj, default=kwargs.pop('default', self.default), option=option).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # orjson emits bytes; hand them to the response as-is instead of going
+        # through dumps() and paying for a str decode plus re-encode
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._option(self.sort_keys) | orjson.OPT_APPEND_NEWLINE
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option),
+                                        mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.json.sort_keys = False  # responses are built in a meaningful order; skip the sort
 
 # CONFIGURATION VARIABLES
 load_dotenv()
@@ -51,16 +110,131 @@ options = ClientOptions(
 
 url = os.environ.get("SUPABASE_URL")
 key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(url, key, options=options)
+
+# Bearer tokens accepted by /send-reports (unset keys are never valid)
+_VALID_TOKENS = tuple(
+    token.encode('utf-8')
+    for token in (key, os.environ.get("SUPABASE_ANON_KEY"))
+    if token
+)
+
+
+@lru_cache(maxsize=1)
+def get_supabase() -> Client:
+    """Return the shared Supabase client, created on first use"""
+    return create_client(url, key, options=options)
+
 
 # Table names (configurable for schema changes)
 LOGS_TABLE = os.getenv("SUPABASE_LOGS_TABLE", "log-man")
 
-# Initialize AWS SES client
-ses_client = None
+# Page size for log queries (PostgREST caps responses at 1000 rows by default)
+LOGS_PAGE_SIZE = 1000
+
+# Location IDs per `loc_id=in.(...)` filter; keeps PostgREST URLs well under proxy limits
+LOGS_IN_FILTER_CHUNK = 100
+
+# How long locations/owners lookups are reused across /send-reports calls
+LOOKUP_CACHE_TTL_SECONDS = int(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300"))
+
+# How long a location's logs for the day are reused across /send-reports calls, so
+# retries and replays skip the query. Off by default: new logs arrive all day and a
+# manual re-run should see them ("forceRefresh": true bypasses it per request)
+LOGS_CACHE_TTL_SECONDS = int(os.getenv("LOGS_CACHE_TTL_SECONDS", "0"))
+
+# Send CSV attachments as .csv.gz (smaller messages, but recipients must unzip)
+COMPRESS_CSV_ATTACHMENTS = os.getenv("COMPRESS_CSV_ATTACHMENTS", "false").lower() == "true"
+
+# Report title (text body) and subject prefix per template number
+TEXT_LABELS = {
+    3: {'title': 'Business Intelligence Report', 'subject': 'Business Intelligence Report'},
+    'default': {'title': 'Daily Business Report', 'subject': 'Daily Report'},
+}
+
+# Optional SES template name; when set, no-data notices go out through
+# SendBulkTemplatedEmail in batches instead of one raw email per owner
+NO_DATA_BULK_TEMPLATE = os.getenv("SES_NO_DATA_TEMPLATE")
+SES_BULK_BATCH_SIZE = 50  # SES limit on destinations per bulk call
+
+# Owners processed concurrently per run (bounded further by the SES send rate)
+REPORT_MAX_WORKERS = max(1, int(os.getenv("REPORT_MAX_WORKERS", "8")))
+
+# Background runs ("async": true). One run at a time per worker, since each already fans
+# out over REPORT_MAX_WORKERS. Job state is one JSON file per job in REPORT_JOB_DIR so any
+# gunicorn worker on the host can answer a status poll; files expire after REPORT_JOB_TTL_SECONDS.
+REPORT_JOB_TTL_SECONDS = int(os.getenv("REPORT_JOB_TTL_SECONDS", "86400"))
+REPORT_JOB_DIR = os.getenv("REPORT_JOB_DIR") or os.path.join(tempfile.gettempdir(), 'petalog-report-jobs')
+_report_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report-job')
+# Jobs queued or running in this process; guards their final write against the shutdown flag
+_active_report_jobs: Set[str] = set()
+_report_jobs_lock = threading.Lock()
+
+# Keep-alive connection pool shared by every send; adaptive retries back off on SES throttling.
+# The pool is never smaller than the worker count so concurrent sends don't discard connections.
+SES_CLIENT_CONFIG = Config(
+    max_pool_connections=max(50, REPORT_MAX_WORKERS),
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    tcp_keepalive=True,
+)
+
+
+class SendRateLimiter:
+    """Token bucket shared by worker threads to stay under the SES send rate.
+
+    `waited` is the total time (seconds) senders have spent blocked on it.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.rate = max(float(rate_per_second), 1.0)
+        self.tokens = self.rate
+        self.updated_at = monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+            sleep(wait)
+
+
+# Sender address validation ("Name <addr>" is unwrapped before matching)
+_EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+')
+_ANGLE_RE = re.compile(r'<([^>]+)>')
+
+
+def _load_from_email() -> str:
+    """Validate SES settings and return the verified sender address"""
+    required_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'SES_VERIFIED_FROM']
+    for var in required_vars:
+        if not os.getenv(var):
+            raise Exception(f"Missing required environment variable: {var}")
+    
+    from_email = os.getenv('SES_VERIFIED_FROM')
+    
+    # Validate email format
+    clean_email = _ANGLE_RE.search(from_email)
+    clean_email = clean_email.group(1) if clean_email else from_email
+    
+    if not _EMAIL_RE.match(clean_email):
+        raise Exception(f"Invalid email format in SES_VERIFIED_FROM: {from_email}")
+    
+    return from_email
+
+
+# Environment is fixed for the life of the process: fail at boot, not per request
+FROM_EMAIL = _load_from_email()
 
 # Timezone configuration (fix 5:30 hrs behind by using IST everywhere)
 IST_TZ = pytz.timezone('Asia/Kolkata')
+IST_OFFSET_MINUTES = 5 * 60 + 30  # IST has no DST, so the UTC offset is fixed
 
 def now_ist() -> datetime:
     return datetime.now(timezone.utc).astimezone(IST_TZ)
@@ -93,78 +267,146 @@ def parse_iso_to_ist(iso_str: str) -> datetime:
     except Exception:
         return now_ist()
 
+def _utc_iso_to_ist_minutes(iso_str: str) -> Optional[int]:
+    """Return minutes past midnight (of the UTC date) shifted to IST, or None.
+
+    Supabase timestamps are fixed-width UTC ISO strings
+    (`YYYY-MM-DDTHH:MM:SS...+00:00`), so hour and minute can be sliced out
+    without building a datetime. Returns None for anything else so callers
+    can fall back to parse_iso_to_ist().
+    """
+    if not iso_str or len(iso_str) < 16 or iso_str[4] != '-' or iso_str[10] not in 'T ' or iso_str[13] != ':':
+        return None
+    tail = iso_str[19:]
+    if not (tail.endswith(('Z', '+00:00')) or ('+' not in tail and '-' not in tail)):
+        return None
+    try:
+        return int(iso_str[11:13]) * 60 + int(iso_str[14:16]) + IST_OFFSET_MINUTES
+    except ValueError:
+        return None
+
+def ist_hour_from_iso(iso_str: str) -> int:
+    minutes = _utc_iso_to_ist_minutes(iso_str)
+    if minutes is None:
+        return parse_iso_to_ist(iso_str).hour
+    return (minutes // 60) % 24
+
 def format_iso_as_ist(iso_str: str, fmt: str = "%d/%m/%Y %H:%M") -> str:
+    if fmt == "%d/%m/%Y %H:%M":
+        minutes = _utc_iso_to_ist_minutes(iso_str)
+        # Fast path only while the IST time stays on the same calendar date
+        if minutes is not None and minutes < 24 * 60:
+            return f"{iso_str[8:10]}/{iso_str[5:7]}/{iso_str[0:4]} {minutes // 60:02d}:{minutes % 60:02d}"
     return parse_iso_to_ist(iso_str).strftime(fmt)
 
+@lru_cache(maxsize=1)
 def get_ses_client():
-    """Initialize and return SES client"""
-    global ses_client
-    if ses_client is None:
-        ses_client = boto3.client(
-            'ses',
-            region_name=os.getenv('AWS_REGION', 'us-east-1'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-    return ses_client
+    """Initialize and return the shared SES client"""
+    return boto3.client(
+        'ses',
+        region_name=os.getenv('AWS_REGION', 'us-east-1'),
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        config=SES_CLIENT_CONFIG
+    )
+
+
+# Create the SES client at import so its connection pool is reused by every request
+try:
+    get_ses_client()
+except Exception as e:
+    logger.warning("SES client initialization deferred: %s", e)
 
 
 def get_owner_display_name(owner: Dict[str, Any]) -> str:
     """Return a display name for an owner using first_name/last_name, fallback to name, email, or id."""
     if not owner:
         return 'Unknown'
+    # `or ''` stays: Supabase returns explicit nulls for unset name columns
     first = (owner.get('first_name') or '').strip()
     last = (owner.get('last_name') or '').strip()
-    if first or last:
-        return f"{first} {last}".strip()
-    # Backwards compatibility if `name` exists
-    if owner.get('name'):
-        return owner.get('name')
-    return owner.get('email') or owner.get('id') or 'Unknown'
+    # `name` kept for backwards compatibility
+    return f"{first} {last}".strip() or owner.get('name') or owner.get('email') or owner.get('id') or 'Unknown'
+
+
+_SLUG_RE = re.compile(r'[^a-zA-Z0-9]')
+
+
+@lru_cache(maxsize=1024)
+def location_slug(location_name: str) -> str:
+    """Filename-safe form of a location name (memoized; names repeat across owners)"""
+    return _SLUG_RE.sub('-', location_name).lower()
 
 
-def get_owner_locations(owner: Dict[str, Any], locations: List[Dict[str, Any]]) -> List[str]:
+@lru_cache(maxsize=4096, typed=True)
+def money(amount: float) -> str:
+    """Rupee amount with thousands separators (memoized; totals repeat across owners)"""
+    return f"₹{amount:,}"
+
+
+def get_owner_locations(owner: Dict[str, Any], locations: List[Dict[str, Any]],
+                        all_location_ids: Optional[List[str]] = None) -> List[str]:
     """
     Get all location IDs assigned to an owner.
     Handles both single location (string) and multiple locations (comma-separated or array).
+    Callers resolving many owners can pass all_location_ids (every location's ID,
+    returned for unassigned owners and not to be mutated) to avoid rebuilding it.
     """
     assigned = owner.get('assigned_location')
     
     if not assigned:
         # If no assignment, owner sees all locations
+        if all_location_ids is not None:
+            return all_location_ids
         return [loc['id'] for loc in locations]
     
     # Handle array format
     if isinstance(assigned, list):
         return assigned
     
-    # Handle comma-separated string format
-    if isinstance(assigned, str):
-        if ',' in assigned:
-            return [loc.strip() for loc in assigned.split(',')]
-        else:
-            return [assigned]
-    
-    return []
+    # Single ID or comma-separated string; blank entries are dropped
+    return [loc for loc in (part.strip() for part in str(assigned).split(',')) if loc]
 
 
-def escape_csv(value: Any) -> str:
-    """Escape CSV values properly"""
+def _csv_cell(value: Any) -> str:
+    """Normalize a CSV cell; quoting and escaping are left to csv.writer"""
     if value is None or value == "":
         return ""
     
+    # Numbers never need trimming or flattening
+    if isinstance(value, (int, float)):
+        return str(value)
+    
     str_value = str(value).strip()
     
-    if re.search(r'[,"\n\r]', str_value):
-        escaped = str_value.replace('"', '""').replace('\r\n', ' ').replace('\n', ' ').replace('\r', ' ')
-        return f'"{escaped}"'
+    if '\n' in str_value or '\r' in str_value:
+        # CRLF first so a Windows line break becomes a single space
+        str_value = str_value.replace('\r\n', ' ').replace('\n', ' ').replace('\r', ' ')
     
     return str_value
 
 
-def generate_no_data_email_html(location_names: str, today_str: str) -> MIMEMultipart:
-    """Generate HTML for no-data notification email"""
-    html = f"""
+class _Echo:
+    """Write target for csv.writer that hands each encoded line straight back"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(headers: Tuple[str, ...], rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    """Yield CSV lines (header first) as rows are consumed, without a buffer"""
+    writer = csv.writer(_Echo(), lineterminator='\n')
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _write_csv(headers: Tuple[str, ...], rows: Iterable[Tuple[Any, ...]]) -> str:
+    """Serialize header + rows with the C csv writer"""
+    return "".join(iter_csv(headers, rows))
+
+
+_NO_DATA_EMAIL_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -202,193 +444,335 @@ def generate_no_data_email_html(location_names: str, today_str: str) -> MIMEMult
     
     <div style="background-color: #f8f9fa; padding: 20px 24px; border-top: 1px solid #e9ecef; text-align: center;">
             <p style="margin: 0; color: #6c757d; font-size: 12px;">
-                Report generated on {format_now_ist()}
+                Report generated on {generated_at}
             </p>
     </div>
     
   </div>
 </body>
 </html>
-    """.strip()
+""".strip()
+
+
+_NO_DATA_EMAIL_TEXT_TEMPLATE = """No Data Report - {today_str}
+
+Locations: {location_names}
+Status: No approved transactions recorded for today across all assigned locations.
+Timezone: {timezone}
+
+Generated on: {generated_at}"""
+
+
+@lru_cache(maxsize=256)
+def _render_no_data_html(location_names: str, today_str: str, generated_at: str) -> str:
+    # Owners sharing locations in the same minute get the same body
+    return _NO_DATA_EMAIL_TEMPLATE.format_map({
+        'location_names': location_names,
+        'today_str': today_str,
+        'generated_at': generated_at,
+    })
+
+
+def generate_no_data_email_html(location_names: str, today_str: str,
+                                generated_at: Optional[str] = None) -> MIMEMultipart:
+    """Generate HTML for no-data notification email (generated_at defaults to now, IST)"""
+    html = _render_no_data_html(html_escape(str(location_names), quote=False), today_str,
+                                generated_at or format_now_ist())
     
-    # Wrap in MIME message
+    # Wrap in MIME message (always fresh: sending mutates its headers)
     msg = MIMEMultipart('related')
     msg.attach(MIMEText(html, 'html', 'utf-8'))
     return msg
 
 
-def fetch_today_filtered_logs(location_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Fetch today's approved logs with joins to new split tables.
+def _select_today_logs(location_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Query today's approved logs with joins to new split tables.
 
     New schema: main table `log-man` with FKs to `vehicle` and `cust`.
     We join needed fields and map results back to legacy keys used by
     analysis and CSV functions to avoid broad code changes.
 
     Args:
-        location_id: Optional location ID to filter by (maps to `loc_id`).
+        location_ids: Optional location IDs to filter by (maps to `loc_id`).
+            None fetches all locations.
 
     Returns:
         List of dicts shaped like the old `logs-man` rows (selected fields).
     """
-    logger.info(f"Fetching today's logs (new schema) for location: {location_id or 'All locations'}")
-
     # Build base query from configurable logs table
     # Join related tables for vehicle and customer details
     # PostgREST join syntax via select: alias:fk_column(*)
+    # Only columns read by analysis/CSV/report code are projected; the other
+    # legacy keys in map_row stay present but None
     select_cols = (
-        "id,created_at,approval_status,entry_time,exit_time,entry_type,service,"
-        "payment_mode,amount,discount,total,loc_id,veh_id,cust_id,"
-        "vehicle:veh_id(id,number_plate,type,veh_det),"
-        "cust:cust_id(id,name,phone)"
+        "id,created_at,approval_status,entry_type,service,"
+        "payment_mode,amount,total,loc_id,"
+        "vehicle:veh_id(number_plate,type,veh_det),"
+        "cust:cust_id(name,phone)"
     )
 
-    query = supabase.table(LOGS_TABLE).select(select_cols)
-    query = query.eq('approval_status', 'approved')
-
-    if location_id:
-        # In new schema, location is stored as `loc_id`
-        query = query.eq('loc_id', location_id)
-
     # Date range: IST day boundaries converted to UTC
     start_of_day, end_of_day = ist_day_utc_bounds()
 
-    query = query.gte('created_at', start_of_day).lt('created_at', end_of_day)
-
     logger.info(
-        f"Filtering for date range: {start_of_day} to {end_of_day} (table: {LOGS_TABLE}, location: {location_id or 'all'})"
+        "Filtering for date range: %s to %s (table: %s, location: %s)",
+        start_of_day, end_of_day, LOGS_TABLE, location_ids or 'all'
     )
 
-    try:
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        query = get_supabase().table(LOGS_TABLE).select(select_cols)
+        query = query.eq('approval_status', 'approved')
+
+        # In new schema, location is stored as `loc_id`
+        if location_ids and len(location_ids) == 1:
+            query = query.eq('loc_id', location_ids[0])
+        elif location_ids:
+            query = query.in_('loc_id', location_ids)
+
+        query = query.gte('created_at', start_of_day).lt('created_at', end_of_day)
+
+        # Page through results so consolidated queries are not truncated by
+        # PostgREST's max-rows limit
+        query = query.order('id').range(offset, offset + LOGS_PAGE_SIZE - 1)
+
         response = query.execute()
-        if hasattr(response, 'error') and response.error:
-            logger.error(f"Error fetching filtered logs: {response.error}")
-            raise Exception(f"Failed to fetch logs: {response.error}")
+        error = getattr(response, 'error', None)
+        if error:
+            logger.error("Error fetching filtered logs: %s", error)
+            raise Exception(f"Failed to fetch logs: {error}")
+
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < LOGS_PAGE_SIZE:
+            break
+        offset += LOGS_PAGE_SIZE
+
+    # Prefetch vehicle models via veh_det from Vehicles_in_india
+    veh_det_ids = list({(r.get('vehicle') or {}).get('veh_det') for r in rows if (r.get('vehicle') or {}).get('veh_det')})
+    models_map: Dict[str, Any] = {}
+    if veh_det_ids:
+        try:
+            # Column name has capital letter and space-sensitive schema -> quote the column
+            model_resp = get_supabase().table('Vehicles_in_india').select('id,"Models"').in_('id', veh_det_ids).execute()
+            for m in (model_resp.data or []):
+                # Map model text from "Models" column
+                models_map[m.get('id')] = m.get('Models')
+        except Exception as me:
+            logger.warning("Failed to fetch vehicle models: %s", me)
+
+    def map_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        vehicle = (row or {}).get('vehicle') or {}
+        cust = (row or {}).get('cust') or {}
+
+        amount_val = None
+        if row.get('amount') is not None:
+            amount_val = row.get('amount')
+        elif row.get('Total') is not None:
+            amount_val = row.get('Total')
+        elif row.get('total') is not None:
+            amount_val = row.get('total')
+
+        mapped = {
+            # Keep most original keys so downstream code works unchanged
+            'id': row.get('id'),
+            'created_at': row.get('created_at'),
+            'approval_status': row.get('approval_status'),
+            'entry_time': row.get('entry_time'),
+            'exit_time': row.get('exit_time'),
+            'entry_type': row.get('entry_type'),
+            'service': row.get('service'),
+            'payment_mode': row.get('payment_mode'),
+            'Amount': amount_val,  # legacy key expected by analysis/CSV
+            'discount': row.get('discount'),
+            # Map new schema FKs to legacy field names
+            'location_id': row.get('loc_id') or row.get('location_id'),
+            'vehicle_id': row.get('veh_id') or row.get('vehicle_id'),
+            'customer_id': row.get('cust_id') or row.get('customer_id'),
+            # Flatten joined details to legacy names
+            'vehicle_number': vehicle.get('number_plate'),
+            'vehicle_type': vehicle.get('type'),
+            'Name': cust.get('name'),
+            'Phone_no': cust.get('phone'),
+            # Fields that may not exist in new schema but are referenced safely
+            'upi_account_name': row.get('upi_account_name'),
+            'vehicle_model': models_map.get(vehicle.get('veh_det')),
+            'remarks': row.get('remarks'),
+            'image_url': row.get('image_url'),
+            'workshop': row.get('workshop'),
+        }
+        return mapped
 
-        rows = response.data or []
+    return [map_row(r) for r in rows]
 
-        # Prefetch vehicle models via veh_det from Vehicles_in_india
-        veh_det_ids = list({(r.get('vehicle') or {}).get('veh_det') for r in rows if (r.get('vehicle') or {}).get('veh_det')})
-        models_map: Dict[str, Any] = {}
-        if veh_det_ids:
-            try:
-                # Column name has capital letter and space-sensitive schema -> quote the column
-                model_resp = supabase.table('Vehicles_in_india').select('id,"Models"').in_('id', veh_det_ids).execute()
-                for m in (model_resp.data or []):
-                    # Map model text from "Models" column
-                    models_map[m.get('id')] = m.get('Models')
-            except Exception as me:
-                logger.warning(f"Failed to fetch vehicle models: {me}")
-
-        def map_row(row: Dict[str, Any]) -> Dict[str, Any]:
-            vehicle = (row or {}).get('vehicle') or {}
-            cust = (row or {}).get('cust') or {}
-
-            amount_val = None
-            if row.get('amount') is not None:
-                amount_val = row.get('amount')
-            elif row.get('Total') is not None:
-                amount_val = row.get('Total')
-            elif row.get('total') is not None:
-                amount_val = row.get('total')
-
-            mapped = {
-                # Keep most original keys so downstream code works unchanged
-                'id': row.get('id'),
-                'created_at': row.get('created_at'),
-                'approval_status': row.get('approval_status'),
-                'entry_time': row.get('entry_time'),
-                'exit_time': row.get('exit_time'),
-                'entry_type': row.get('entry_type'),
-                'service': row.get('service'),
-                'payment_mode': row.get('payment_mode'),
-                'Amount': amount_val,  # legacy key expected by analysis/CSV
-                'discount': row.get('discount'),
-                # Map new schema FKs to legacy field names
-                'location_id': row.get('loc_id') or row.get('location_id'),
-                'vehicle_id': row.get('veh_id') or row.get('vehicle_id'),
-                'customer_id': row.get('cust_id') or row.get('customer_id'),
-                # Flatten joined details to legacy names
-                'vehicle_number': vehicle.get('number_plate'),
-                'vehicle_type': vehicle.get('type'),
-                'Name': cust.get('name'),
-                'Phone_no': cust.get('phone'),
-                # Fields that may not exist in new schema but are referenced safely
-                'upi_account_name': row.get('upi_account_name'),
-                'vehicle_model': models_map.get(vehicle.get('veh_det')),
-                'remarks': row.get('remarks'),
-                'image_url': row.get('image_url'),
-                'workshop': row.get('workshop'),
-            }
-            return mapped
 
-        logs = [map_row(r) for r in rows]
-        logger.info(f"Found {len(logs)} approved logs for today (new schema)")
+def fetch_today_filtered_logs(location_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Fetch today's approved logs for a single location (or all locations).
+
+    Args:
+        location_id: Optional location ID to filter by (maps to `loc_id`).
+
+    Returns:
+        List of dicts shaped like the old `logs-man` rows (selected fields).
+    """
+    logger.info("Fetching today's logs (new schema) for location: %s", location_id or 'All locations')
+
+    try:
+        logs = _select_today_logs([location_id] if location_id else None)
+        logger.info("Found %s approved logs for today (new schema)", len(logs))
         return logs
     except Exception as e:
-        logger.error(f"Error fetching logs for location {location_id}: {e}")
+        logger.error("Error fetching logs for location %s: %s", location_id, e)
         raise
 
 
+def fetch_today_logs_bulk(location_ids: List[str],
+                          all_locations: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch today's approved logs for many locations with as few queries as possible.
+
+    Pass all_locations=True when location_ids covers every location: the query
+    then skips the `loc_id` filter. Otherwise IDs are filtered LOGS_IN_FILTER_CHUNK
+    at a time so the request URL stays short.
+
+    Rows are bucketed by `location_id` in memory. Every requested location gets
+    an entry, so locations without data map to an empty list.
+    """
+    logger.info("Fetching today's logs (new schema) for %s locations in bulk", len(location_ids))
+
+    try:
+        if all_locations:
+            logs = _select_today_logs(None)
+        else:
+            logs = []
+            for start in range(0, len(location_ids), LOGS_IN_FILTER_CHUNK):
+                logs.extend(_select_today_logs(location_ids[start:start + LOGS_IN_FILTER_CHUNK]))
+    except Exception as e:
+        logger.error("Error fetching logs for locations %s: %s", location_ids, e)
+        raise
+
+    by_loc: Dict[str, List[Dict[str, Any]]] = {location_id: [] for location_id in location_ids}
+    for log in logs:
+        by_loc.setdefault(log['location_id'], []).append(log)
+
+    logger.info("Found %s approved logs for today across %s locations", len(logs), len(location_ids))
+    return by_loc
+
+
+# Today's logs keyed by (location ID, IST date); entries are never mutated once stored
+_logs_ttl_cache: TTLCache = TTLCache(maxsize=1024, ttl=max(LOGS_CACHE_TTL_SECONDS, 1))
+_logs_ttl_cache_lock = threading.Lock()
+
+
+# Locations/owners lookups keyed by name. Only non-empty results are stored, so a
+# transient empty or failed response is retried on the next run instead of sticking.
+_lookup_cache: TTLCache = TTLCache(maxsize=2, ttl=LOOKUP_CACHE_TTL_SECONDS)
+_lookup_cache_lock = threading.Lock()
+
+
+def _cached_lookup(name: str, fetch: Callable[[], Optional[List[Dict[str, Any]]]]) -> Optional[List[Dict[str, Any]]]:
+    with _lookup_cache_lock:
+        rows = _lookup_cache.get(name)
+    if rows:
+        return rows
+    
+    rows = fetch()
+    if rows:
+        with _lookup_cache_lock:
+            _lookup_cache[name] = rows
+    return rows
+
+
+def _fetch_locations() -> List[Dict[str, Any]]:
+    """Fetch all locations; cached briefly so retries/replays skip the round-trip"""
+    return _cached_lookup('locations', lambda: get_supabase().table('locations').select('*').execute().data)
+
+
+def _fetch_all_owners() -> List[Dict[str, Any]]:
+    """Fetch every owner user; cached briefly so retries/replays skip the round-trip"""
+    return _cached_lookup('owners', lambda: get_supabase().table('users').select('id,email,assigned_location,role,first_name,last_name').eq('role', 'owner').execute().data)
+
+
+def _hourly_entry(hour: int) -> Dict[str, Any]:
+    hour_12 = 12 if hour % 12 == 0 else hour % 12
+    period = 'AM' if hour < 12 else 'PM'
+    return {
+        'hour': hour,
+        'label': f"{hour_12:02d} {period}",
+        'period': period,
+        'display': f"{hour_12}:00 {period}",
+        'amount': 0,
+        'count': 0,
+        'transactions': 0,
+        'revenue': 0
+    }
+
+
+# Labels never change, so analyze_data only shallow-copies these per call
+_HOURLY_TEMPLATE = tuple(_hourly_entry(hour) for hour in range(24))
+
+
 def analyze_data(logs: List[Dict[str, Any]], locations: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Generate comprehensive data analysis"""
-    logger.info(f"Analyzing {len(logs)} log entries...")
+    """Generate comprehensive data analysis.
+
+    All breakdowns are accumulated in a single pass over `logs`.
+    """
+    logger.info("Analyzing %s log entries...", len(logs))
     
-    total_revenue = sum(log.get('Amount', 0) for log in logs)
+    total_revenue = 0
     total_vehicles = len(logs)
-    avg_service = total_revenue / total_vehicles if total_vehicles > 0 else 0
+    payment_mode_breakdown = {}
+    service_breakdown = {}
+    vehicle_distribution = {}
+    # Distinct payment modes are few, so normalize each raw value only once
+    normalized_modes: Dict[str, str] = {}
     
-    logger.info(f"Analysis summary: ₹{total_revenue} revenue, {total_vehicles} vehicles, ₹{avg_service:.2f} avg")
+    # Hourly breakdown (copies of the static 24-hour skeleton)
+    hourly_breakdown = [dict(hour) for hour in _HOURLY_TEMPLATE]
     
-    # Payment mode breakdown
-    payment_mode_breakdown = {}
     for log in logs:
+        amount = log.get('Amount', 0)
+        total_revenue += amount
+        
+        # Payment mode breakdown
         payment_mode = log.get('payment_mode', 'Cash')
-        normalized_mode = payment_mode.lower()
+        normalized_mode = normalized_modes.get(payment_mode)
+        if normalized_mode is None:
+            normalized_mode = normalized_modes[payment_mode] = payment_mode.lower()
         
-        if normalized_mode not in payment_mode_breakdown:
-            payment_mode_breakdown[normalized_mode] = {
+        payment = payment_mode_breakdown.get(normalized_mode)
+        if payment is None:
+            payment = payment_mode_breakdown[normalized_mode] = {
                 'mode': payment_mode,
                 'displayName': payment_mode,
                 'count': 0,
-                'transactions': 0,
                 'revenue': 0,
                 'percentage': 0,
-                'upiAccounts': {},
-                'details': {}
+                'upiAccounts': {}
             }
         
-        payment_mode_breakdown[normalized_mode]['count'] += 1
-        payment_mode_breakdown[normalized_mode]['transactions'] += 1
-        payment_mode_breakdown[normalized_mode]['revenue'] += log.get('Amount', 0)
+        payment['count'] += 1
+        payment['revenue'] += amount
         
-        if normalized_mode == 'upi' and log.get('upi_account_name'):
-            account_name = log['upi_account_name']
-            if account_name not in payment_mode_breakdown[normalized_mode]['upiAccounts']:
-                payment_mode_breakdown[normalized_mode]['upiAccounts'][account_name] = {
-                    'count': 0,
-                    'amount': 0
-                }
-                payment_mode_breakdown[normalized_mode]['details'][account_name] = {
-                    'count': 0,
-                    'amount': 0
-                }
-            
-            payment_mode_breakdown[normalized_mode]['upiAccounts'][account_name]['count'] += 1
-            payment_mode_breakdown[normalized_mode]['upiAccounts'][account_name]['amount'] += log.get('Amount', 0)
-            payment_mode_breakdown[normalized_mode]['details'][account_name]['count'] += 1
-            payment_mode_breakdown[normalized_mode]['details'][account_name]['amount'] += log.get('Amount', 0)
-    
-    for payment in payment_mode_breakdown.values():
-        payment['percentage'] = (payment['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
-    
-    # Service breakdown
-    service_breakdown = {}
-    for log in logs:
-        service = log.get('service', 'Unknown')
-        if service not in service_breakdown:
-            service_breakdown[service] = {
-                'service': service,
-                'name': service,
+        if normalized_mode == 'upi':
+            account_name = log.get('upi_account_name')
+            if account_name:
+                account = payment['upiAccounts'].get(account_name)
+                if account is None:
+                    account = payment['upiAccounts'][account_name] = {
+                        'count': 0,
+                        'amount': 0
+                    }
+                account['count'] += 1
+                account['amount'] += amount
+        
+        # Service breakdown
+        service_name = log.get('service', 'Unknown')
+        service = service_breakdown.get(service_name)
+        if service is None:
+            service = service_breakdown[service_name] = {
+                'service': service_name,
+                'name': service_name,
                 'count': 0,
                 'revenue': 0,
                 'price': 0,
@@ -396,59 +780,63 @@ def analyze_data(logs: List[Dict[str, Any]], locations: List[Dict[str, Any]]) ->
                 'revenueShare': 0
             }
         
-        service_breakdown[service]['count'] += 1
-        service_breakdown[service]['revenue'] += log.get('Amount', 0)
-        service_breakdown[service]['price'] = service_breakdown[service]['revenue'] / service_breakdown[service]['count']
-        service_breakdown[service]['averagePrice'] = service_breakdown[service]['price']
-    
-    for service in service_breakdown.values():
-        service['revenueShare'] = (service['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
-    
-    # Vehicle type distribution
-    vehicle_distribution = {}
-    for log in logs:
+        service['count'] += 1
+        service['revenue'] += amount
+        
+        # Vehicle type distribution
         vtype = log.get('vehicle_type', 'Unknown')
-        if vtype not in vehicle_distribution:
-            vehicle_distribution[vtype] = {
+        vehicle = vehicle_distribution.get(vtype)
+        if vehicle is None:
+            vehicle = vehicle_distribution[vtype] = {
                 'type': vtype,
                 'count': 0,
                 'percentage': 0
             }
-        vehicle_distribution[vtype]['count'] += 1
-    
-    for vehicle in vehicle_distribution.values():
-        vehicle['percentage'] = (vehicle['count'] / total_vehicles * 100) if total_vehicles > 0 else 0
-    
-    # Hourly breakdown
-    hourly_breakdown = []
-    for i in range(24):
-        hour_12 = 12 if i % 12 == 0 else i % 12
-        period = 'AM' if i < 12 else 'PM'
-        hourly_breakdown.append({
-            'hour': i,
-            'label': f"{hour_12:02d} {period}",
-            'period': period,
-            'display': f"{hour_12}:00 {period}",
-            'amount': 0,
-            'count': 0,
-            'transactions': 0,
-            'revenue': 0
-        })
+        vehicle['count'] += 1
+        
+        # Hourly breakdown
+        hour = ist_hour_from_iso(log['created_at'])
+        hourly = hourly_breakdown[hour]
+        hourly['count'] += 1
+        hourly['revenue'] += amount
     
-    for log in logs:
-        created = parse_iso_to_ist(log['created_at'])
-        hour = created.hour
-        hourly_breakdown[hour]['amount'] += log.get('Amount', 0)
-        hourly_breakdown[hour]['count'] += 1
-        hourly_breakdown[hour]['transactions'] += 1
-        hourly_breakdown[hour]['revenue'] += log.get('Amount', 0)
+    avg_service = total_revenue / total_vehicles if total_vehicles > 0 else 0
+    
+    logger.info("Analysis summary: ₹%s revenue, %s vehicles, ₹%.2f avg", total_revenue, total_vehicles, avg_service)
+    
+    # Entries start with zero shares, so the percentage math is skipped without revenue
+    for payment in payment_mode_breakdown.values():
+        payment['transactions'] = payment['count']
+        if total_revenue > 0:
+            payment['percentage'] = payment['revenue'] / total_revenue * 100
+        # `details` is the legacy name for the same per-account data
+        if payment['upiAccounts']:
+            payment['details'] = payment['upiAccounts']
+        else:
+            del payment['upiAccounts']
+    
+    for service in service_breakdown.values():
+        service['price'] = service['revenue'] / service['count']
+        service['averagePrice'] = service['price']
+        if total_revenue > 0:
+            service['revenueShare'] = service['revenue'] / total_revenue * 100
+    
+    if total_vehicles > 0:
+        for vehicle in vehicle_distribution.values():
+            vehicle['percentage'] = vehicle['count'] / total_vehicles * 100
+    
+    # `amount`/`transactions` are legacy names for `revenue`/`count`
+    for hourly in hourly_breakdown:
+        if hourly['count']:
+            hourly['amount'] = hourly['revenue']
+            hourly['transactions'] = hourly['count']
     
     peak_hour = max(hourly_breakdown, key=lambda x: x['revenue'])
-    service_list = list(service_breakdown.values())
-    peak_service = max(service_list, key=lambda x: x['revenue']) if service_list else {'name': 'N/A', 'revenue': 0}
     
     payment_mode_breakdown_array = list(payment_mode_breakdown.values())
     service_breakdown_array = sorted(service_breakdown.values(), key=lambda x: x['revenue'], reverse=True)
+    # Stable sort: the first entry is the same one max() would pick on ties
+    peak_service = service_breakdown_array[0] if service_breakdown_array else {'name': 'N/A', 'revenue': 0}
     vehicle_distribution_array = sorted(vehicle_distribution.values(), key=lambda x: x['count'], reverse=True)
     hourly_breakdown_filtered = [h for h in hourly_breakdown if h['count'] > 0 or h['amount'] > 0]
     
@@ -479,49 +867,54 @@ def analyze_data(logs: List[Dict[str, Any]], locations: List[Dict[str, Any]]) ->
     }
 
 
+_REPORT_CSV_HEADERS = ("Vehicle Number", "Owner Name", "Phone", "Vehicle Model", "Service Type", "Price",
+                       "Payment Mode", "UPI Account", "Entry Type", "Date", "Location")
+_PAYMENT_CSV_HEADERS = ("Payment Mode", "Total Revenue", "Vehicle Count", "Percentage of Total", "UPI Accounts")
+_SERVICE_CSV_HEADERS = ("Service Type", "Total Revenue", "Vehicle Count", "Average Price", "Percentage of Revenue")
+
+
 def generate_report_csv(logs: List[Dict[str, Any]], locations: List[Dict[str, Any]]) -> str:
     """Generate main report CSV"""
-    logger.info(f"Generating main report CSV for {len(logs)} logs...")
+    logger.info("Generating main report CSV for %s logs...", len(logs))
     
-    rows = []
-    for log in logs:
-        location_name = "Unknown"
-        for loc in locations:
-            if loc['id'] == log.get('location_id'):
-                location_name = loc['name']
-                break
-        
-        rows.append({
-            "Vehicle Number": escape_csv(log.get('vehicle_number')),
-            "Owner Name": escape_csv(log.get('Name')),
-            "Phone": escape_csv(log.get('Phone_no')),
-            "Vehicle Model": escape_csv(log.get('vehicle_model')),
-            "Service Type": escape_csv(log.get('service')),
-            "Price": escape_csv(log.get('Amount')),
-            "Payment Mode": escape_csv(log.get('payment_mode')),
-            "UPI Account": escape_csv(log.get('upi_account_name')),
-            "Entry Type": escape_csv(log.get('entry_type')),
-            "Date": escape_csv(format_iso_as_ist(log['created_at'], "%d/%m/%Y %H:%M")),
-            "Location": escape_csv(location_name)
-        })
-    
-    if not rows:
+    if not logs:
         return ""
     
-    headers = list(rows[0].keys())
-    csv_lines = [",".join(headers)]
-    
-    for row in rows:
-        csv_lines.append(",".join(str(row[h]) for h in headers))
+    loc_by_id = {loc['id']: loc for loc in locations}
+    unknown_location = {'name': "Unknown"}
+    
+    # Rows are produced lazily as the writer consumes them, so the full
+    # table of cell tuples never sits in memory next to the CSV text
+    rows = (
+        (
+            _csv_cell(log.get('vehicle_number')),
+            _csv_cell(log.get('Name')),
+            _csv_cell(log.get('Phone_no')),
+            _csv_cell(log.get('vehicle_model')),
+            _csv_cell(log.get('service')),
+            _csv_cell(log.get('Amount')),
+            _csv_cell(log.get('payment_mode')),
+            _csv_cell(log.get('upi_account_name')),
+            _csv_cell(log.get('entry_type')),
+            _csv_cell(format_iso_as_ist(log['created_at'], "%d/%m/%Y %H:%M")),
+            _csv_cell(loc_by_id.get(log.get('location_id'), unknown_location)['name'])
+        )
+        for log in logs
+    )
     
-    return "\n".join(csv_lines)
+    return _write_csv(_REPORT_CSV_HEADERS, rows)
+
 
+def generate_payment_breakdown_csv(logs: List[Dict[str, Any]],
+                                   analysis: Optional[Dict[str, Any]] = None) -> str:
+    """Generate payment breakdown CSV.
 
-def generate_payment_breakdown_csv(logs: List[Dict[str, Any]]) -> str:
-    """Generate payment breakdown CSV"""
+    Pass the already computed `analysis` for these logs to avoid re-analyzing them.
+    """
     logger.info("Generating payment breakdown CSV...")
     
-    analysis = analyze_data(logs, [])
+    if analysis is None:
+        analysis = analyze_data(logs, [])
     
     rows = []
     for item in analysis['paymentModeBreakdown']:
@@ -532,128 +925,101 @@ def generate_payment_breakdown_csv(logs: List[Dict[str, Any]]) -> str:
                 accounts.append(f"{account_name}: ₹{account_data['amount']} ({account_data['count']} vehicles)")
             upi_accounts = '; '.join(accounts)
         
-        rows.append({
-            "Payment Mode": escape_csv(item['mode']),
-            "Total Revenue": escape_csv(item['revenue']),
-            "Vehicle Count": escape_csv(item['count']),
-            "Percentage of Total": escape_csv(f"{item['percentage']:.1f}%"),
-            "UPI Accounts": escape_csv(upi_accounts)
-        })
+        rows.append((
+            _csv_cell(item['mode']),
+            _csv_cell(item['revenue']),
+            _csv_cell(item['count']),
+            _csv_cell(f"{item['percentage']:.1f}%"),
+            _csv_cell(upi_accounts)
+        ))
     
     if not rows:
         return ""
     
-    headers = list(rows[0].keys())
-    csv_lines = [",".join(headers)]
-    
-    for row in rows:
-        csv_lines.append(",".join(str(row[h]) for h in headers))
-    
-    return "\n".join(csv_lines)
+    return _write_csv(_PAYMENT_CSV_HEADERS, rows)
+
 
+def generate_service_breakdown_csv(logs: List[Dict[str, Any]],
+                                   analysis: Optional[Dict[str, Any]] = None) -> str:
+    """Generate service breakdown CSV.
 
-def generate_service_breakdown_csv(logs: List[Dict[str, Any]]) -> str:
-    """Generate service breakdown CSV"""
+    Pass the already computed `analysis` for these logs to avoid re-analyzing them.
+    """
     logger.info("Generating service breakdown CSV...")
     
-    analysis = analyze_data(logs, [])
+    if analysis is None:
+        analysis = analyze_data(logs, [])
     
     rows = []
     for item in analysis['serviceBreakdown']:
         percentage = (item['revenue'] / analysis['totalRevenue'] * 100) if analysis['totalRevenue'] > 0 else 0
-        rows.append({
-            "Service Type": escape_csv(item['service']),
-            "Total Revenue": escape_csv(item['revenue']),
-            "Vehicle Count": escape_csv(item['count']),
-            "Average Price": escape_csv(round(item['price'])),
-            "Percentage of Revenue": escape_csv(f"{percentage:.1f}%")
-        })
+        rows.append((
+            _csv_cell(item['service']),
+            _csv_cell(item['revenue']),
+            _csv_cell(item['count']),
+            _csv_cell(round(item['price'])),
+            _csv_cell(f"{percentage:.1f}%")
+        ))
     
     if not rows:
         return ""
     
-    headers = list(rows[0].keys())
-    csv_lines = [",".join(headers)]
-    
-    for row in rows:
-        csv_lines.append(",".join(str(row[h]) for h in headers))
-    
-    return "\n".join(csv_lines)
+    return _write_csv(_SERVICE_CSV_HEADERS, rows)
 
 
 def generate_email_html(analysis: Dict[str, Any], location_name: str, today_str: str,
-                       template_no: int):
+                       template_no: int, generated_at: Optional[str] = None):
     """Generate email content using selected template.
 
     Returns a MIMEMultipart object (so CID images are preserved). For templates
     that only return HTML (template1), we wrap the HTML into a related multipart.
+    generated_at is the run's IST footer stamp (defaults to now, IST).
     """
+    generated_at = generated_at or format_now_ist()
+    
     # Template 2 and 3 already return a MIMEMultipart (related) object
     if template_no == 3:
-        return generate_template3_html(analysis, location_name, today_str)
+        return generate_template3_html(analysis, location_name, today_str, generated_at)
     elif template_no == 2:
-        return generate_template2_html(analysis, location_name, today_str)
+        return generate_template2_html(analysis, location_name, today_str, generated_at)
 
     # Template 1 returns an HTML string; wrap it into a MIMEMultipart
-    html = generate_template1_html(analysis, location_name, today_str)
+    html = generate_template1_html(analysis, location_name, today_str, generated_at)
     msg = MIMEMultipart('related')
     msg.attach(MIMEText(html, 'html', 'utf-8'))
     return msg
 
 
-def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]], 
-                                       locations: List[Dict[str, Any]], 
-                                       today_str: str, 
-                                       template_no: int) -> MIMEMultipart:
-    """Generate multi-location report HTML"""
-    
-    # Calculate totals
-    total_revenue = sum(data['analysis']['totalRevenue'] for data in location_data.values())
-    total_vehicles = sum(data['analysis']['totalVehicles'] for data in location_data.values())
-    total_locations = len(location_data)
-    avg_per_location = total_revenue / total_locations if total_locations > 0 else 0
-    
-    # Generate location comparison table rows
-    location_rows = ""
-    for data in location_data.values():
-        location_rows += f"""
+_LOCATION_COMPARISON_ROW_TEMPLATE = """
               <tr>
-                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{data['location_name']}</td>
-                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: right; font-weight: 600; font-size: 13px;">₹{data['analysis']['totalRevenue']:,}</td>
-                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{data['analysis']['totalVehicles']}</td>
-                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: right; font-size: 13px;">{(data['analysis']['totalRevenue']/total_revenue*100):.1f}%</td>
+                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{location_name}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: right; font-weight: 600; font-size: 13px;">₹{revenue:,}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{vehicles}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #e9ecef; text-align: right; font-size: 13px;">{share:.1f}%</td>
               </tr>
               """
-    
-    # Generate individual location sections
-    location_sections = []
-    for location_id, data in location_data.items():
-        analysis = data['analysis']
-        location_name = data['location_name']
-        
-        location_sections.append(f"""
+
+_LOCATION_SECTION_TEMPLATE = """
         <div style="margin-bottom: 32px; padding: 24px; background: #f8f9fa; border-radius: 8px; border-left: 4px solid #667eea;">
           <h3 style="margin: 0 0 16px 0; font-size: 20px; color: #333;">📍 {location_name}</h3>
           <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 16px;">
             <div style="background: white; padding: 16px; border-radius: 8px; text-align: center;">
               <p style="margin: 0; font-size: 12px; color: #666;">Total Revenue</p>
-              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #667eea;">₹{analysis['totalRevenue']:,}</h4>
+              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #667eea;">₹{revenue:,}</h4>
             </div>
             <div style="background: white; padding: 16px; border-radius: 8px; text-align: center;">
               <p style="margin: 0; font-size: 12px; color: #666;">Vehicles</p>
-              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #f093fb;">{analysis['totalVehicles']}</h4>
+              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #f093fb;">{vehicles}</h4>
             </div>
             <div style="background: white; padding: 16px; border-radius: 8px; text-align: center;">
               <p style="margin: 0; font-size: 12px; color: #666;">Avg Service</p>
-              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #4facfe;">₹{round(analysis['avgService'])}</h4>
+              <h4 style="margin: 8px 0 0 0; font-size: 24px; font-weight: 700; color: #4facfe;">₹{avg_service}</h4>
             </div>
           </div>
         </div>
-                """)
-    
-    location_sections_html = ''.join(location_sections)
-    
-    html = f"""
+                """
+
+_MULTI_LOCATION_REPORT_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -691,7 +1057,7 @@ def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]]
           </div>
           <div style="background: white; padding: 16px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
             <p style="margin: 0; font-size: 12px; color: #666; text-transform: uppercase;">Avg/Location</p>
-            <h3 style="margin: 6px 0 0 0; font-size: 26px; font-weight: 700; color: #2e7d32;">₹{round(avg_per_location):,}</h3>
+            <h3 style="margin: 6px 0 0 0; font-size: 26px; font-weight: 700; color: #2e7d32;">₹{avg_per_location:,}</h3>
           </div>
         </div>
         
@@ -708,7 +1074,7 @@ def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]]
               </tr>
             </thead>
             <tbody>
-              {location_rows}
+              {location_rows_html}
             </tbody>
           </table>
         </div>
@@ -729,7 +1095,7 @@ def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]]
     
     <div style="background-color: #f8f9fa; padding: 20px 24px; border-top: 1px solid #e9ecef; text-align: center;">
             <p style="margin: 0; color: #6c757d; font-size: 12px;">
-                Report generated on {format_now_ist()}
+                Report generated on {generated_at}
             </p>
     </div>
     
@@ -737,54 +1103,82 @@ def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]]
 </body>
 </html>
     """.strip()
+
+
+def generate_multi_location_report_html(location_data: Dict[str, Dict[str, Any]], 
+                                       locations: List[Dict[str, Any]], 
+                                       today_str: str, 
+                                       template_no: int,
+                                       generated_at: Optional[str] = None) -> MIMEMultipart:
+    """Generate multi-location report HTML (generated_at defaults to now, IST)"""
+    
+    # One pass over the locations: accumulate totals and render each section
+    total_revenue = 0
+    total_vehicles = 0
+    location_totals = []
+    location_sections = []
+    for data in location_data.values():
+        analysis = data['analysis']
+        location_name = html_escape(str(data['location_name']), quote=False)
+        revenue = analysis['totalRevenue']
+        vehicles = analysis['totalVehicles']
+        total_revenue += revenue
+        total_vehicles += vehicles
+        location_totals.append((location_name, revenue, vehicles))
+        
+        location_sections.append(_LOCATION_SECTION_TEMPLATE.format(
+            location_name=location_name,
+            revenue=revenue,
+            vehicles=vehicles,
+            avg_service=round(analysis['avgService'])
+        ))
+    
+    total_locations = len(location_data)
+    avg_per_location = total_revenue / total_locations if total_locations > 0 else 0
+    
+    # Comparison rows need the grand total for each location's share
+    location_rows = [
+        _LOCATION_COMPARISON_ROW_TEMPLATE.format(
+            location_name=location_name,
+            revenue=revenue,
+            vehicles=vehicles,
+            share=revenue/total_revenue*100 if total_revenue else 0.0
+        )
+        for location_name, revenue, vehicles in location_totals
+    ]
+    
+    html = _MULTI_LOCATION_REPORT_TEMPLATE.format_map({
+        'today_str': today_str,
+        'total_locations': total_locations,
+        'total_revenue': total_revenue,
+        'total_vehicles': total_vehicles,
+        'avg_per_location': round(avg_per_location),
+        'location_rows_html': ''.join(location_rows),
+        'location_sections_html': ''.join(location_sections),
+        'generated_at': generated_at or format_now_ist(),
+    })
     
     msg = MIMEMultipart('related')
     msg.attach(MIMEText(html, 'html', 'utf-8'))
     return msg
 
 
-def generate_summary_report_html(summary_data: Dict[str, Any], today_str: str) -> str:
-    """Generate HTML for admin summary report"""
-    
-    success_count = summary_data.get('successCount', 0)
-    failed_count = summary_data.get('failedCount', 0)
-    skipped_count = summary_data.get('skippedCount', 0)
-    total_count = summary_data.get('totalCount', 0)
-    total_revenue = summary_data.get('totalRevenue', 0)
-    total_records = summary_data.get('totalRecords', 0)
-    results = summary_data.get('results', [])
-    
-    # Calculate success rate (avoid division by zero)
-    success_rate = (success_count/total_count*100) if total_count > 0 else 0.0
-    
-    # Generate results table rows
-    results_rows = ""
-    for result in results:
-        status_color = '#28a745' if result.get('status') == 'success' else '#dc3545' if result.get('status') == 'failed' else '#ffc107'
-        status_icon = '✅' if result.get('status') == 'success' else '❌' if result.get('status') == 'failed' else '⭐️'
-        
-        revenue = result.get('revenue', 0)
-        record_count = result.get('recordCount', 0)
-        locations = result.get('locations', 0)
-        template = result.get('templateUsed', 'N/A')
-        timezone = result.get('timezone', 'N/A')
-        
-        results_rows += f"""
+_SUMMARY_RESULT_ROW_TEMPLATE = """
         <tr>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{result.get('owner', 'N/A')}</td>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{result.get('email', 'N/A')}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{owner}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{email}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">
-            <span style="color: {status_color}; font-weight: 600;">{status_icon} {result.get('status', 'unknown').upper()}</span>
+            <span style="color: {status_color}; font-weight: 600;">{status_icon} {status_label}</span>
           </td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right; font-size: 13px;">₹{revenue:,}</td>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{record_count}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{recordCount}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{locations}</td>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{template}</td>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{result.get('error', 'N/A')}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center; font-size: 13px;">{templateUsed}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef; font-size: 13px;">{error}</td>
         </tr>
         """
-    
-    return f"""
+
+_SUMMARY_REPORT_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -872,25 +1266,108 @@ def generate_summary_report_html(summary_data: Dict[str, Any], today_str: str) -
     
     <div style="background-color: #f8f9fa; padding: 20px 24px; border-top: 1px solid #e9ecef; text-align: center;">
             <p style="margin: 0; color: #6c757d; font-size: 12px;">
-                Report generated on {format_now_ist()}
+                Report generated on {generated_at}
             </p>
     </div>
     
   </div>
 </body>
 </html>
-    """.strip()
+""".strip()
+
+
+# (colour, icon) per result status; anything else renders as skipped
+_SUMMARY_STATUS_STYLES = {'success': ('#28a745', '✅'), 'failed': ('#dc3545', '❌')}
+_SUMMARY_STATUS_DEFAULT = ('#ffc107', '⭐️')
+_SUMMARY_ESCAPED_FIELDS = ('owner', 'email', 'error')
+
+
+class _SummaryRowFields(dict):
+    """format_map source for a summary row; keys a result lacks use the column default"""
+    _DEFAULTS = {'revenue': 0, 'recordCount': 0, 'locations': 0}
+
+    def __missing__(self, key: str) -> Any:
+        return self._DEFAULTS.get(key, 'N/A')
+
+
+def summary_result_row_html(result: Dict[str, Any]) -> str:
+    """Render one owner's row of the admin summary results table"""
+    status = result.get('status', 'unknown')
+    status_color, status_icon = _SUMMARY_STATUS_STYLES.get(status, _SUMMARY_STATUS_DEFAULT)
+    
+    fields = _SummaryRowFields(
+        result,
+        status_color=status_color,
+        status_icon=status_icon,
+        status_label=status.upper()
+    )
+    # Names, addresses and SES error text are user/provider data; keep them inert
+    for key in _SUMMARY_ESCAPED_FIELDS:
+        if key in result:
+            fields[key] = html_escape(str(result[key]), quote=False)
+    return _SUMMARY_RESULT_ROW_TEMPLATE.format_map(fields)
+
+
+def generate_summary_report_html(summary_data: Dict[str, Any], today_str: str,
+                                 row_html: Optional[List[str]] = None,
+                                 generated_at: Optional[str] = None) -> str:
+    """Generate HTML for admin summary report.
+
+    row_html may carry the results rows already rendered (one per entry of
+    summary_data['results']); otherwise they are rendered here. generated_at
+    defaults to now (IST).
+    """
+    
+    success_count = summary_data.get('successCount', 0)
+    total_count = summary_data.get('totalCount', 0)
+    results = summary_data.get('results', [])
+    
+    # Calculate success rate (avoid division by zero)
+    success_rate = (success_count/total_count*100) if total_count > 0 else 0.0
+    
+    # Generate results table rows
+    if row_html is None:
+        row_html = [summary_result_row_html(result) for result in results]
+    
+    return _SUMMARY_REPORT_TEMPLATE.format_map({
+        'today_str': today_str,
+        'success_count': success_count,
+        'failed_count': summary_data.get('failedCount', 0),
+        'skipped_count': summary_data.get('skippedCount', 0),
+        'total_count': total_count,
+        'total_revenue': summary_data.get('totalRevenue', 0),
+        'total_records': summary_data.get('totalRecords', 0),
+        'success_rate': success_rate,
+        'results_rows': "".join(row_html),
+        'generated_at': generated_at or format_now_ist(),
+    })
+
+
+# CSV attachments are mostly ASCII; quoted-printable avoids base64's 33% overhead
+_CSV_CHARSET = Charset('utf-8')
+_CSV_CHARSET.body_encoding = QP
+
+
+def _flatten_message(msg: MIMEMultipart) -> bytes:
+    """Serialize a MIME message straight to bytes for send_raw_email"""
+    buf = io.BytesIO()
+    # Emit CRLF line endings (the RFC 5322 wire form) while keeping the
+    # message's own compat32 header handling
+    BytesGenerator(buf, mangle_from_=False, policy=msg.policy.clone(linesep='\r\n')).flatten(msg)
+    return buf.getvalue()
 
 
 def send_email_with_attachments_ses(from_email: str, to_email: str, subject: str,
                                     html_content_or_msg, text_content: str,
-                                    attachments: List[Dict[str, Any]]):
+                                    attachments: List[Dict[str, Any]],
+                                    rate_limiter: Optional[SendRateLimiter] = None):
     """Send email with attachments using AWS SES API.
 
     html_content_or_msg may be either a string (HTML) or a prebuilt
     MIMEMultipart message (used by template2/3 which embed CID images). This
     function will attach CSVs to the outgoing message and send the final raw
-    MIME via SES so inline images (CIDs) are preserved.
+    MIME via SES so inline images (CIDs) are preserved. When rate_limiter is
+    given, the send waits for a token first.
     """
 
     # If caller supplied a MIMEMultipart (template with inline images), use it
@@ -926,32 +1403,132 @@ def send_email_with_attachments_ses(from_email: str, to_email: str, subject: str
         msg_body.attach(html_part)
         msg.attach(msg_body)
 
-    # Attach CSV files
+    # Attach CSV files as text (quoted-printable keeps them near their raw size),
+    # or gzipped when COMPRESS_CSV_ATTACHMENTS is on
     for attachment in attachments:
-        part = MIMEBase('application', 'octet-stream')
-        part.set_payload(attachment['content'].encode('utf-8'))
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', f'attachment; filename={attachment["filename"]}')
+        if COMPRESS_CSV_ATTACHMENTS:
+            part = MIMEApplication(gzip.compress(attachment['content'].encode('utf-8'), compresslevel=6), 'gzip')
+            part.add_header('Content-Disposition', 'attachment', filename=f"{attachment['filename']}.gz")
+        else:
+            part = MIMEText(attachment['content'], 'csv', _CSV_CHARSET)
+            part.add_header('Content-Disposition', 'attachment', filename=attachment['filename'])
         msg.attach(part)
 
     try:
         ses = get_ses_client()
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         response = ses.send_raw_email(
             Source=from_email,
             Destinations=[to_email],
-            RawMessage={'Data': msg.as_string()}
+            RawMessage={'Data': _flatten_message(msg)}
         )
-        logger.info(f"SES API response: MessageId {response['MessageId']}")
+        logger.info("SES API response: MessageId %s", response['MessageId'])
+        # Retries mean SES throttled or dropped a pooled connection; surface them
+        retry_attempts = response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        if retry_attempts:
+            logger.warning("SES send to %s succeeded after %d retries", to_email, retry_attempts)
         return response
     except ClientError as e:
-        logger.error(f"SES API error: {e.response['Error']['Message']}")
+        logger.error("SES API error: %s", e.response['Error']['Message'])
         raise Exception(f"Failed to send email via SES: {e.response['Error']['Message']}")
 
 
-@app.route('/send-reports', methods=['POST'])
-def send_reports():
-    """Main endpoint to send daily reports - now with scheduling support"""
+def _owner_result(owner_name: str, email: Optional[str], status: str, **extra: Any) -> Dict[str, Any]:
+    """Build one entry of the send_reports `results` list"""
+    return {'owner': owner_name, 'email': email, 'status': status, **extra}
+
+
+_no_data_template_ready = False
+_no_data_template_lock = threading.Lock()
+
+
+def ensure_no_data_template(template_name: str):
+    """Create the SES no-data template on first use; an existing template is left as-is"""
+    global _no_data_template_ready
+    # Concurrent runs (request threads, background jobs) share one check-and-create
+    with _no_data_template_lock:
+        if _no_data_template_ready:
+            return
+        
+        ses = get_ses_client()
+        try:
+            ses.get_template(TemplateName=template_name)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TemplateDoesNotExist':
+                raise
+            placeholders = {
+                'today_str': '{{today_str}}',
+                'location_names': '{{location_names}}',
+                'timezone': '{{timezone}}',
+                'generated_at': '{{generated_at}}',
+            }
+            try:
+                ses.create_template(Template={
+                    'TemplateName': template_name,
+                    'SubjectPart': 'No Data Today - {{today_str}}',
+                    'HtmlPart': _NO_DATA_EMAIL_TEMPLATE.format_map(placeholders),
+                    'TextPart': _NO_DATA_EMAIL_TEXT_TEMPLATE.format_map(placeholders),
+                })
+                logger.info("Created SES template %s", template_name)
+            except ClientError as create_error:
+                # Another process created it first; that template is just as usable
+                if create_error.response['Error']['Code'] not in ('AlreadyExists', 'AlreadyExistsException'):
+                    raise
+                logger.info("SES template %s already exists", template_name)
+        _no_data_template_ready = True
+
+
+def send_no_data_bulk_ses(from_email: str, template_name: str, today_str: str, generated_at: str,
+                          recipients: List[Tuple[str, Dict[str, str]]],
+                          rate_limiter: Optional[SendRateLimiter] = None) -> List[Optional[str]]:
+    """Send no-data notices via SendBulkTemplatedEmail, SES_BULK_BATCH_SIZE per call.
+
+    recipients holds (email, template data) pairs. Returns one entry per
+    recipient, in order: None when SES accepted it, else the error message.
+    """
+    ensure_no_data_template(template_name)
+    ses = get_ses_client()
+    
+    shared_data = {'today_str': today_str, 'generated_at': generated_at}
+    default_data = orjson.dumps({**shared_data, 'location_names': '', 'timezone': ''}).decode()
+    
+    errors: List[Optional[str]] = []
+    for start in range(0, len(recipients), SES_BULK_BATCH_SIZE):
+        batch = recipients[start:start + SES_BULK_BATCH_SIZE]
+        if rate_limiter is not None:
+            # SES meters the send rate per recipient, not per API call
+            for _ in batch:
+                rate_limiter.acquire()
+        try:
+            response = ses.send_bulk_templated_email(
+                Source=from_email,
+                Template=template_name,
+                DefaultTemplateData=default_data,
+                Destinations=[
+                    {
+                        'Destination': {'ToAddresses': [email]},
+                        'ReplacementTemplateData': orjson.dumps({**shared_data, **data}).decode()
+                    }
+                    for email, data in batch
+                ]
+            )
+        except ClientError as e:
+            logger.error("SES API error: %s", e.response['Error']['Message'])
+            errors.extend([f"Failed to send email via SES: {e.response['Error']['Message']}"] * len(batch))
+            continue
+        
+        for status in response['Status']:
+            if status.get('Status') == 'Success':
+                errors.append(None)
+            else:
+                errors.append(f"{status.get('Status')}: {status.get('Error', '')}".strip())
     
+    return errors
+
+
+def _authorization_error():
+    """Return a 401 response unless the request carries a valid Bearer token"""
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
         logger.error('Unauthorized: Missing or invalid Authorization header')
@@ -961,11 +1538,11 @@ def send_reports():
             'message': 'Please provide a valid Authorization header with Bearer token'
         }), 401
     
-    token = auth_header.replace('Bearer ', '')
-    service_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-    anon_key = os.getenv('SUPABASE_ANON_KEY')
+    # startswith() above guarantees the prefix, so slice it off
+    token = auth_header[len('Bearer '):].encode('utf-8')
     
-    if token not in [service_key, anon_key]:
+    # Constant-time comparison so the check does not leak how much of a key matched
+    if not any(hmac.compare_digest(token, valid) for valid in _VALID_TOKENS):
         logger.error('Unauthorized: Invalid token')
         return jsonify({
             'success': False,
@@ -974,6 +1551,139 @@ def send_reports():
         }), 401
     
     logger.info('Authorization verified successfully')
+    return None
+
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _report_job_path(job_id: str) -> str:
+    return os.path.join(REPORT_JOB_DIR, f"{job_id}.json")
+
+
+def _save_report_job(job: Dict[str, Any]) -> None:
+    """Write a job's state atomically so concurrent readers never see a partial file"""
+    os.makedirs(REPORT_JOB_DIR, exist_ok=True)
+    path = _report_job_path(job['jobId'])
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(job))
+    os.replace(tmp_path, path)
+
+
+def _load_report_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Read a job's state; unknown, malformed or expired job IDs return None"""
+    if not _JOB_ID_RE.match(job_id):
+        return None
+    path = _report_job_path(job_id)
+    try:
+        if datetime.now().timestamp() - os.path.getmtime(path) > REPORT_JOB_TTL_SECONDS:
+            return None
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_report_jobs() -> None:
+    """Delete job files older than REPORT_JOB_TTL_SECONDS"""
+    cutoff = datetime.now().timestamp() - REPORT_JOB_TTL_SECONDS
+    try:
+        entries = os.scandir(REPORT_JOB_DIR)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _run_report_job(job_id: str, payload: Dict[str, Any], auth_header: str) -> None:
+    """Run a queued /send-reports call and record its summary under job_id"""
+    try:
+        _save_report_job({'jobId': job_id, 'status': 'running'})
+        
+        # Same in-process proxy as /dev/send-reports and CLI mode
+        with app.test_request_context(
+            '/send-reports',
+            method='POST',
+            json=payload,
+            headers={'Authorization': auth_header}
+        ):
+            resp, status = send_reports()
+            job = {
+                'jobId': job_id,
+                'status': 'completed' if status == 200 else 'failed',
+                'httpStatus': status,
+                'result': resp.get_json()
+            }
+    except Exception as e:
+        logger.error("Report job %s failed: %s", job_id, e, exc_info=True)
+        job = {'jobId': job_id, 'status': 'failed', 'error': str(e)}
+    
+    with _report_jobs_lock:
+        try:
+            _save_report_job(job)
+        except OSError as e:
+            logger.error("Could not record report job %s: %s", job_id, e)
+        _active_report_jobs.discard(job_id)
+    logger.info("Report job %s finished: %s", job_id, job['status'])
+
+
+def warn_unfinished_report_jobs() -> None:
+    """Log and flag background jobs this process has not finished.
+
+    Called from gunicorn's worker_exit hook: queued or running jobs are lost
+    if the worker is killed before they complete.
+    """
+    with _report_jobs_lock:
+        unfinished = sorted(_active_report_jobs)
+        if not unfinished:
+            return
+        logger.warning("Worker exiting with %d unfinished report job(s), which may be lost: %s",
+                       len(unfinished), ', '.join(unfinished))
+        for job_id in unfinished:
+            job = _load_report_job(job_id) or {'jobId': job_id, 'status': 'queued'}
+            job['warning'] = 'Worker shut down before this job finished; it may never complete'
+            try:
+                _save_report_job(job)
+            except OSError:
+                pass
+
+
+@app.route('/send-reports', methods=['POST'])
+def send_reports():
+    """Main endpoint to send daily reports - now with scheduling support"""
+    
+    auth_error = _authorization_error()
+    if auth_error:
+        return auth_error
+    
+    # Opt-in background run: reply 202 right away and let the caller poll
+    # /reports/status/<jobId>, so long runs don't hold the request open
+    async_data = request.get_json(silent=True)
+    if isinstance(async_data, dict) and async_data.get('async'):
+        job_id = uuid.uuid4().hex
+        payload = {k: v for k, v in async_data.items() if k != 'async'}
+        _prune_report_jobs()
+        try:
+            _save_report_job({'jobId': job_id, 'status': 'queued'})
+        except OSError as e:
+            logger.error("Could not record report job %s: %s", job_id, e)
+            return jsonify({'success': False, 'error': f"Could not queue report job: {e}"}), 500
+        with _report_jobs_lock:
+            _active_report_jobs.add(job_id)
+        _report_job_executor.submit(_run_report_job, job_id, payload, request.headers['Authorization'])
+        logger.info("Queued report job %s", job_id)
+        return jsonify({
+            'success': True,
+            'jobId': job_id,
+            'status': 'queued',
+            'statusUrl': f"/reports/status/{job_id}"
+        }), 202
     
     try:
         logger.info("Starting daily reports generation...")
@@ -987,45 +1697,39 @@ def send_reports():
         templateno_override = request_data.get('templateno')
         timezone_override = request_data.get('timezone')
         location_ids_override = request_data.get('location_ids')  # optional list of location IDs
+        force_refresh = bool(request_data.get('forceRefresh'))  # skip the cross-run logs cache
         
-        logger.info(f"Trigger source: {trigger_source}")
-        logger.info(f"Scheduled users count: {len(scheduled_users)}")
-        
-        # Validate environment variables
-        required_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'SES_VERIFIED_FROM']
-        for var in required_vars:
-            if not os.getenv(var):
-                raise Exception(f"Missing required environment variable: {var}")
+        logger.info("Trigger source: %s", trigger_source)
+        logger.info("Scheduled users count: %s", len(scheduled_users))
         
-        from_email = os.getenv('SES_VERIFIED_FROM')
+        from_email = FROM_EMAIL
         
-        # Validate email format
-        email_regex = r'^[^\s@]+@[^\s@]+\.[^\s@]+'
-        clean_email = re.search(r'<([^>]+)>', from_email)
-        clean_email = clean_email.group(1) if clean_email else from_email
+        logger.info("Using FROM email: %s", from_email)
         
-        if not re.match(email_regex, clean_email):
-            raise Exception(f"Invalid email format in SES_VERIFIED_FROM: {from_email}")
+        # Get today's date in IST (fix 5:30 hrs behind). The clock is read once so
+        # every email in the run shares the same date and "generated on" stamp.
+        run_started_ist = now_ist()
+        today_str = run_started_ist.strftime("%d/%m/%Y")
+        date_str = run_started_ist.strftime("%Y-%m-%d")  # CSV filename date
+        generated_at = run_started_ist.strftime("%d/%m/%Y at %H:%M")
         
-        logger.info(f"Using FROM email: {from_email}")
-        
-        # Get today's date in IST (fix 5:30 hrs behind)
-        today_str = now_ist().strftime("%d/%m/%Y")
-        
-        logger.info(f"Generating reports for date: {today_str}")
+        logger.info("Generating reports for date: %s", today_str)
         
         # Get locations
         try:
-            response = supabase.table('locations').select('*').execute()
-            locations = response.data
+            locations = _fetch_locations()
         except Exception as e:
-            logger.error(f"Failed to fetch locations: {e}")
+            logger.error("Failed to fetch locations: %s", e)
             raise Exception(f"Failed to fetch locations: {str(e)}")
         
         if not locations:
             raise Exception("Failed to fetch locations")
         
-        logger.info(f"Found {len(locations)} locations")
+        logger.info("Found %s locations", len(locations))
+        
+        loc_by_id = {loc['id']: loc for loc in locations}
+        unknown_location = {'name': "Unknown Location"}
+        all_location_ids = list(loc_by_id)
         
         # If email_override is provided, bypass Supabase user lookup entirely
         owners = None
@@ -1046,7 +1750,7 @@ def send_reports():
                 'templateno': templ_no_val,
                 'timezone': timezone_override or 'UTC'
             }]
-            logger.info(f"Using email_override for testing: {email_override}; template={templ_no_val}; tz={timezone_override or 'UTC'}; locations={(location_ids_override or 'ALL')} ")
+            logger.info("Using email_override for testing: %s; template=%s; tz=%s; locations=%s ", email_override, templ_no_val, timezone_override or 'UTC', location_ids_override or 'ALL')
 
         # Fetch owners based on scheduled users (normal flow)
         if owners is None and scheduled_users:
@@ -1055,23 +1759,23 @@ def send_reports():
             if not user_ids:
                 raise Exception("No valid user_id values found in request payload")
             
-            logger.info(f"Fetching scheduled users from database: {user_ids}")
+            logger.info("Fetching scheduled users from database: %s", user_ids)
             
             # Fetch users from database
-            response = supabase.table('users').select('id,email,assigned_location,role,first_name,last_name').in_('id', user_ids).eq('role', 'owner').execute()
+            response = get_supabase().table('users').select('id,email,assigned_location,role,first_name,last_name').in_('id', user_ids).eq('role', 'owner').execute()
             owners = response.data
             
             # Fetch schedules for these users
             try:
                 user_ids_list = [owner['id'] for owner in owners]
                 if user_ids_list:
-                    schedule_response = supabase.table('user_schedules').select('user_id,templateno,timezone').in_('user_id', user_ids_list).execute()
+                    schedule_response = get_supabase().table('user_schedules').select('user_id,templateno,timezone').in_('user_id', user_ids_list).execute()
                     schedules_map = {sched['user_id']: sched for sched in (schedule_response.data or [])}
-                    logger.info(f"Fetched {len(schedules_map)} user schedules")
+                    logger.info("Fetched %s user schedules", len(schedules_map))
                 else:
                     schedules_map = {}
             except Exception as e:
-                logger.error(f"Failed to fetch schedules batch: {e}")
+                logger.error("Failed to fetch schedules batch: %s", e)
                 schedules_map = {}
             
             # Map schedule data to owners
@@ -1086,37 +1790,37 @@ def send_reports():
                     if templateno_from_db is not None:
                         try:
                             owner['templateno'] = int(templateno_from_db)
-                            logger.info(f"✓ Using templateno={owner['templateno']} from user_schedules for user {user_id}")
+                            logger.info("✓ Using templateno=%s from user_schedules for user %s", owner['templateno'], user_id)
                         except (ValueError, TypeError):
-                            logger.warning(f"Invalid templateno value '{templateno_from_db}' for user {user_id}, defaulting to 1")
+                            logger.warning("Invalid templateno value '%s' for user %s, defaulting to 1", templateno_from_db, user_id)
                             owner['templateno'] = 1
                     else:
-                        logger.warning(f"templateno not found for user {user_id}, defaulting to 1")
+                        logger.warning("templateno not found for user %s, defaulting to 1", user_id)
                         owner['templateno'] = 1
                     
                     owner['timezone'] = timezone_from_db
-                    logger.info(f"✓ Using timezone={timezone_from_db} for user {user_id}")
+                    logger.info("✓ Using timezone=%s for user %s", timezone_from_db, user_id)
                 else:
-                    logger.warning(f"No schedule found for user {user_id}, using defaults")
+                    logger.warning("No schedule found for user %s, using defaults", user_id)
                     owner['templateno'] = 1
                     owner['timezone'] = 'UTC'
         elif owners is None:
             # Fallback: fetch all owners (backward compatibility)
             logger.warning("No scheduled users provided - using backward compatibility mode")
-            response = supabase.table('users').select('id,email,assigned_location,role,first_name,last_name').eq('role', 'owner').execute()
-            owners = response.data
+            # Copy the cached rows: schedule fields are written onto each owner below
+            owners = [dict(owner) for owner in (_fetch_all_owners() or [])]
             
             # Fetch schedules for all owners
             try:
                 user_ids_list = [owner['id'] for owner in owners]
                 if user_ids_list:
-                    schedule_response = supabase.table('user_schedules').select('user_id,templateno,timezone').in_('user_id', user_ids_list).execute()
+                    schedule_response = get_supabase().table('user_schedules').select('user_id,templateno,timezone').in_('user_id', user_ids_list).execute()
                     schedules_map = {sched['user_id']: sched for sched in (schedule_response.data or [])}
-                    logger.info(f"Fetched {len(schedules_map)} user schedules")
+                    logger.info("Fetched %s user schedules", len(schedules_map))
                 else:
                     schedules_map = {}
             except Exception as e:
-                logger.error(f"Failed to fetch schedules batch: {e}")
+                logger.error("Failed to fetch schedules batch: %s", e)
                 schedules_map = {}
             
             # Map schedule data to owners
@@ -1134,15 +1838,17 @@ def send_reports():
                     owner['templateno'] = 1
                     owner['timezone'] = 'UTC'
         
-        logger.info(f"Found {len(owners) if owners else 0} owners to process")
+        logger.info("Found %s owners to process", len(owners) if owners else 0)
         
         # Verify SES connection
         try:
             ses = get_ses_client()
             quota = ses.get_send_quota()
-            logger.info(f"SES connection verified. Daily quota: {quota['Max24HourSend']}, sent today: {quota['SentLast24Hours']}")
+            logger.info("SES connection verified. Daily quota: %s, sent today: %s", quota['Max24HourSend'], quota['SentLast24Hours'])
+            # Leave one send/sec of headroom below the account's MaxSendRate (14/s by default)
+            rate_limiter = SendRateLimiter(max(1, quota.get('MaxSendRate', 14) - 1))
         except Exception as e:
-            logger.error(f"SES verification failed: {e}")
+            logger.error("SES verification failed: %s", e)
             raise Exception(f"SES configuration invalid: {str(e)}")
         
         emails_sent = 0
@@ -1151,42 +1857,93 @@ def send_reports():
         email_results = []
         total_revenue_summary = 0
         total_records_summary = 0
-        
-        # Process each owner
-        for owner in (owners or []):
+
+        # Per-request cache of today's logs keyed by location ID. Owners often
+        # share locations, so each location is fetched from Supabase only once.
+        logs_cache: Dict[Optional[str], List[Dict[str, Any]]] = {}
+
+        # Per-request analyze_data results keyed by location ID (read-only once built)
+        analysis_cache: Dict[str, Dict[str, Any]] = {}
+
+        # Per-request (report, payment, service) CSV text keyed by location ID
+        csv_cache: Dict[str, Tuple[str, str, str]] = {}
+
+        # Prefetch logs for every location any owner needs in a single query;
+        # locations missing from the cache fall back to per-location fetches
+        needed_location_ids = list(dict.fromkeys(
+            location_id
+            for owner in (owners or []) if owner.get('email')
+            for location_id in get_owner_locations(owner, locations, all_location_ids)
+        ))
+        # Locations fetched by a recent run for the same day are served from memory
+        cache_hits = 0
+        if needed_location_ids and LOGS_CACHE_TTL_SECONDS > 0 and not force_refresh:
+            with _logs_ttl_cache_lock:
+                for location_id in needed_location_ids:
+                    cached_logs = _logs_ttl_cache.get((location_id, date_str))
+                    if cached_logs is not None:
+                        logs_cache[location_id] = cached_logs
+                        cache_hits += 1
+            needed_location_ids = [location_id for location_id in needed_location_ids if location_id not in logs_cache]
+            if cache_hits:
+                logger.info("Reusing cached logs for %s location(s)", cache_hits)
+        if needed_location_ids:
+            try:
+                # When every location is needed the loc_id filter would only lengthen the URL
+                fetched_logs = fetch_today_logs_bulk(
+                    needed_location_ids,
+                    all_locations=loc_by_id.keys() <= set(needed_location_ids)
+                )
+                logs_cache.update(fetched_logs)
+                if LOGS_CACHE_TTL_SECONDS > 0:
+                    with _logs_ttl_cache_lock:
+                        for location_id, location_logs in fetched_logs.items():
+                            _logs_ttl_cache[(location_id, date_str)] = location_logs
+            except Exception as e:
+                logger.warning("Bulk log fetch failed, falling back to per-location queries: %s", e)
+
+        # Per-request rendered report bodies keyed by (location IDs with data, template,
+        # multi-location). Sending mutates the message, so users get a deep copy.
+        render_cache: Dict[Tuple[Tuple[str, ...], int, bool], MIMEMultipart] = {}
+        render_locks: Dict[Tuple[Tuple[str, ...], int, bool], threading.Lock] = {}
+
+        # (result, template data) for no-data owners awaiting a bulk templated send
+        no_data_bulk: List[Tuple[Dict[str, Any], Dict[str, str]]] = []
+
+        def process_owner(owner: Dict[str, Any]) -> Dict[str, Any]:
+            """Build and send one owner's report; returns its entry for email_results."""
+            display_name = get_owner_display_name(owner)
+            
             if not owner.get('email'):
-                logger.info(f"Skipping owner {owner['id']}: no email")
-                emails_skipped += 1
-                email_results.append({
-                    'owner': get_owner_display_name(owner),
-                    'email': owner.get('email', 'No email'),
-                    'status': 'skipped',
-                    'reason': 'No email address',
-                    'timezone': owner.get('timezone', 'N/A')
-                })
-                continue
+                logger.info("Skipping owner %s: no email", owner['id'])
+                return _owner_result(
+                    display_name,
+                    owner.get('email', 'No email'),
+                    'skipped',
+                    reason='No email address',
+                    timezone=owner.get('timezone', 'N/A')
+                )
             
             # Get all locations for this owner
-            owner_location_ids = get_owner_locations(owner, locations)
+            owner_location_ids = get_owner_locations(owner, locations, all_location_ids)
             
             if not owner_location_ids:
-                logger.info(f"Skipping owner {owner['email']}: no locations assigned")
-                emails_skipped += 1
-                email_results.append({
-                    'owner': get_owner_display_name(owner),
-                    'email': owner['email'],
-                    'status': 'skipped',
-                    'reason': 'No locations assigned',
-                    'timezone': owner.get('timezone', 'N/A')
-                })
-                continue
+                logger.info("Skipping owner %s: no locations assigned", owner['email'])
+                return _owner_result(
+                    display_name,
+                    owner['email'],
+                    'skipped',
+                    reason='No locations assigned',
+                    timezone=owner.get('timezone', 'N/A')
+                )
             
             # Get template and timezone from user_schedules (now stored in owner dict)
             owner_template_no = owner.get('templateno', 1) or 1
             owner_timezone = owner.get('timezone', 'UTC')
             is_multi_location = len(owner_location_ids) > 1
             
-            logger.info(f"Processing owner {owner['email']} - {len(owner_location_ids)} location(s), Template {owner_template_no}, Timezone: {owner_timezone}")
+            logger.info("Processing owner %s - %d location(s), Template %s, Timezone: %s",
+                        owner['email'], len(owner_location_ids), owner_template_no, owner_timezone)
             
             # Fetch data for each location
             location_data = {}
@@ -1196,22 +1953,23 @@ def send_reports():
             # Fetch logs for all locations (ENTIRE DAY - old version logic)
             for location_id in owner_location_ids:
                 try:
-                    # OLD VERSION: Fetch entire day's data
-                    location_logs = fetch_today_filtered_logs(location_id)
+                    # OLD VERSION: Fetch entire day's data (cached per request)
+                    location_logs = logs_cache.get(location_id)
+                    if location_logs is None:
+                        location_logs = fetch_today_filtered_logs(location_id)
+                        logs_cache[location_id] = location_logs
                     
                     # Find location name
-                    location_name = "Unknown Location"
-                    for loc in locations:
-                        if loc['id'] == location_id:
-                            location_name = loc['name']
-                            break
+                    location_name = loc_by_id.get(location_id, unknown_location)['name']
                     
                     if len(location_logs) > 0:
                         has_any_data = True
                         all_logs.extend(location_logs)
                         
-                        # Generate analysis for this location
-                        analysis = analyze_data(location_logs, locations)
+                        # Analysis depends only on the location's logs, so owners sharing it reuse one result
+                        analysis = analysis_cache.get(location_id)
+                        if analysis is None:
+                            analysis = analysis_cache[location_id] = analyze_data(location_logs, locations)
                         
                         location_data[location_id] = {
                             'analysis': analysis,
@@ -1219,27 +1977,48 @@ def send_reports():
                             'location_name': location_name
                         }
                         
-                        logger.info(f"  - {location_name}: {len(location_logs)} records, ₹{analysis['totalRevenue']:,}")
+                        logger.info("  - %s: %d records, %s", location_name, len(location_logs), money(analysis['totalRevenue']))
                     else:
-                        logger.info(f"  - {location_name}: No data")
+                        logger.info("  - %s: No data", location_name)
                         
                 except Exception as e:
-                    logger.error(f"Failed to fetch logs for location {location_id}: {e}")
+                    logger.error("Failed to fetch logs for location %s: %s", location_id, e)
                     # Continue with other locations even if one fails
             
             # If no data at all locations, send no-data email
             if not has_any_data:
-                logger.info(f"No data across all locations for {owner['email']}")
+                logger.info("No data across all locations for %s", owner['email'])
                 try:
-                    location_names = ", ".join([loc['name'] for loc in locations if loc['id'] in owner_location_ids])
-                    no_data_html = generate_no_data_email_html(location_names, today_str)
-                    no_data_text = f"""No Data Report - {today_str}
-
-Locations: {location_names}
-Status: No approved transactions recorded for today across all assigned locations.
-Timezone: {owner_timezone}
-
-Generated on: {format_now_ist()}"""
+                    location_names = ", ".join([
+                        loc_by_id[location_id]['name']
+                        for location_id in dict.fromkeys(owner_location_ids)
+                        if location_id in loc_by_id
+                    ])
+                    
+                    if NO_DATA_BULK_TEMPLATE:
+                        # Sent in bulk after all owners are processed; the status is
+                        # set there from SES's per-destination response
+                        result = _owner_result(
+                            display_name,
+                            owner['email'],
+                            'pending',
+                            recordCount=0,
+                            revenue=0,
+                            locations=len(owner_location_ids),
+                            emailType='no-data',
+                            templateUsed=owner_template_no,
+                            timezone=owner_timezone
+                        )
+                        no_data_bulk.append((result, {'location_names': location_names, 'timezone': owner_timezone}))
+                        return result
+                    
+                    no_data_html = generate_no_data_email_html(location_names, today_str, generated_at)
+                    no_data_text = _NO_DATA_EMAIL_TEXT_TEMPLATE.format_map({
+                        'today_str': today_str,
+                        'location_names': location_names,
+                        'timezone': owner_timezone,
+                        'generated_at': generated_at,
+                    })
                     
                     send_email_with_attachments_ses(
                         from_email,
@@ -1247,62 +2026,77 @@ Generated on: {format_now_ist()}"""
                         f"No Data Today - {today_str}",
                         no_data_html,
                         no_data_text,
-                        []
+                        [],
+                        rate_limiter=rate_limiter
                     )
                     
-                    emails_sent += 1
-                    email_results.append({
-                        'owner': get_owner_display_name(owner),
-                        'email': owner['email'],
-                        'status': 'success',
-                        'recordCount': 0,
-                        'revenue': 0,
-                        'locations': len(owner_location_ids),
-                        'emailType': 'no-data',
-                        'templateUsed': owner_template_no,
-                        'timezone': owner_timezone
-                    })
+                    return _owner_result(
+                        display_name,
+                        owner['email'],
+                        'success',
+                        recordCount=0,
+                        revenue=0,
+                        locations=len(owner_location_ids),
+                        emailType='no-data',
+                        templateUsed=owner_template_no,
+                        timezone=owner_timezone
+                    )
                 except Exception as e:
-                    logger.error(f"Failed to send no-data email to {owner['email']}: {e}")
-                    emails_failed += 1
-                    email_results.append({
-                        'owner': get_owner_display_name(owner),
-                        'email': owner['email'],
-                        'status': 'failed',
-                        'error': str(e),
-                        'templateUsed': owner_template_no,
-                        'timezone': owner_timezone
-                    })
-                continue
+                    logger.error("Failed to send no-data email to %s: %s", owner['email'], e)
+                    return _owner_result(
+                        display_name,
+                        owner['email'],
+                        'failed',
+                        error=str(e),
+                        templateUsed=owner_template_no,
+                        timezone=owner_timezone
+                    )
             
             # Send report with data
             try:
+                # Owners with the same locations and template get the same body;
+                # render it (charts included) once per request
+                render_key = (tuple(location_data), owner_template_no, is_multi_location)
+                
                 # Generate appropriate HTML based on location count
                 if is_multi_location:
-                    # Multi-location report
-                    html_content = generate_multi_location_report_html(
-                        location_data, locations, today_str, owner_template_no
-                    )
                     subject_suffix = f"{len(location_data)} Locations"
                 else:
                     # Single location report (use existing templates)
                     single_location_data = list(location_data.values())[0]
                     analysis = single_location_data['analysis']
                     location_name = single_location_data['location_name']
-                    
-                    html_content = generate_email_html(analysis, location_name, today_str, owner_template_no)
                     subject_suffix = location_name
                 
+                # Per-key lock so concurrent owners wait for one render instead of repeating it
+                with render_locks.setdefault(render_key, threading.Lock()):
+                    rendered = render_cache.get(render_key)
+                    if rendered is None:
+                        if is_multi_location:
+                            # Multi-location report
+                            rendered = generate_multi_location_report_html(
+                                location_data, locations, today_str, owner_template_no, generated_at
+                            )
+                        else:
+                            rendered = generate_email_html(analysis, location_name, today_str, owner_template_no, generated_at)
+                        render_cache[render_key] = rendered
+                html_content = copy.deepcopy(rendered)
+                
                 # Generate CSV attachments for each location
                 attachments = []
-                date_str = now_ist().strftime("%Y-%m-%d")
                 
                 for location_id, data in location_data.items():
-                    location_safe = re.sub(r'[^a-zA-Z0-9]', '-', data['location_name']).lower()
+                    location_safe = location_slug(data['location_name'])
                     
-                    report_csv = generate_report_csv(data['logs'], locations)
-                    payment_csv = generate_payment_breakdown_csv(data['logs'])
-                    service_csv = generate_service_breakdown_csv(data['logs'])
+                    # location_data only holds locations with logs; owners sharing one reuse its CSVs
+                    csvs = csv_cache.get(location_id)
+                    if csvs is None:
+                        csvs = csv_cache[location_id] = (
+                            generate_report_csv(data['logs'], locations),
+                            generate_payment_breakdown_csv(data['logs'], data['analysis']),
+                            generate_service_breakdown_csv(data['logs'], data['analysis'])
+                        )
+                    report_csv, payment_csv, service_csv = csvs
                     
                     attachments.extend([
                         {
@@ -1324,61 +2118,114 @@ Generated on: {format_now_ist()}"""
                 total_records_owner = len(all_logs)
                 
                 # Generate text version
-                text_content = f"""{'Business Intelligence Report' if owner_template_no == 3 else 'Daily Business Report'} - {today_str}
+                labels = TEXT_LABELS.get(owner_template_no, TEXT_LABELS['default'])
+                location_lines = "\n".join(
+                    f"{data['location_name']}: {money(data['analysis']['totalRevenue'])} ({data['analysis']['totalVehicles']} vehicles)"
+                    for data in location_data.values()
+                )
+                text_content = f"""{labels['title']} - {today_str}
 
 {'Multi-Location Report' if is_multi_location else subject_suffix}
 Total Locations: {len(location_data)}
-Total Revenue: ₹{total_revenue_owner:,}
+Total Revenue: {money(total_revenue_owner)}
 Total Transactions: {total_records_owner}
 Timezone: {owner_timezone}
 
 LOCATION BREAKDOWN:
-{chr(10).join(f"{data['location_name']}: ₹{data['analysis']['totalRevenue']:,} ({data['analysis']['totalVehicles']} vehicles)" for data in location_data.values())}
+{location_lines}
 
 Template Used: {owner_template_no}
-Generated on: {format_now_ist()}"""
+Generated on: {generated_at}"""
                 
                 # Send email
                 send_email_with_attachments_ses(
                     from_email,
                     owner['email'],
-                    f"{'Business Intelligence Report' if owner_template_no == 3 else 'Daily Report'} - {today_str} - {subject_suffix}",
+                    f"{labels['subject']} - {today_str} - {subject_suffix}",
                     html_content,
                     text_content,
-                    attachments
+                    attachments,
+                    rate_limiter=rate_limiter
                 )
                 
-                emails_sent += 1
-                total_revenue_summary += total_revenue_owner
-                total_records_summary += total_records_owner
-                
-                logger.info(f"Email sent to {owner['email']} ({len(location_data)} location(s), {total_records_owner} records, ₹{total_revenue_owner:,}, Template {owner_template_no}, TZ: {owner_timezone})")
+                logger.info("Email sent to %s (%d location(s), %d records, %s, Template %s, TZ: %s)",
+                            owner['email'], len(location_data), total_records_owner, money(total_revenue_owner),
+                            owner_template_no, owner_timezone)
                 
-                email_results.append({
-                    'owner': get_owner_display_name(owner),
-                    'email': owner['email'],
-                    'status': 'success',
-                    'recordCount': total_records_owner,
-                    'revenue': total_revenue_owner,
-                    'locations': len(location_data),
-                    'locationNames': ', '.join([d['location_name'] for d in location_data.values()]),
-                    'attachments': len(attachments),
-                    'templateUsed': owner_template_no,
-                    'timezone': owner_timezone,
-                    'emailType': 'multi-location' if is_multi_location else 'single-location'
-                })
+                return _owner_result(
+                    display_name,
+                    owner['email'],
+                    'success',
+                    recordCount=total_records_owner,
+                    revenue=total_revenue_owner,
+                    locations=len(location_data),
+                    locationNames=', '.join([d['location_name'] for d in location_data.values()]),
+                    attachments=len(attachments),
+                    templateUsed=owner_template_no,
+                    timezone=owner_timezone,
+                    emailType='multi-location' if is_multi_location else 'single-location'
+                )
                 
             except Exception as e:
-                logger.error(f"Failed to send email to {owner['email']}: {e}")
+                logger.error("Failed to send email to %s: %s", owner['email'], e)
+                return _owner_result(
+                    display_name,
+                    owner['email'],
+                    'failed',
+                    error=str(e),
+                    templateUsed=owner_template_no,
+                    timezone=owner_timezone
+                )
+        
+        # Process owners concurrently; SES sends and Supabase fetches are network-bound.
+        # map() keeps submission order so the summary lists owners predictably.
+        def process_owner_with_row(owner: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+            result = process_owner(owner)
+            # Render the admin summary row here so it overlaps other workers' sends
+            return result, summary_result_row_html(result)
+        
+        summary_rows: List[str] = []
+        with ThreadPoolExecutor(max_workers=REPORT_MAX_WORKERS) as executor:
+            for result, row in executor.map(process_owner_with_row, owners or []):
+                email_results.append(result)
+                summary_rows.append(row)
+        
+        if no_data_bulk:
+            logger.info("Sending %s no-data emails via SES template %s", len(no_data_bulk), NO_DATA_BULK_TEMPLATE)
+            try:
+                errors = send_no_data_bulk_ses(
+                    from_email,
+                    NO_DATA_BULK_TEMPLATE,
+                    today_str,
+                    generated_at,
+                    [(result['email'], data) for result, data in no_data_bulk],
+                    rate_limiter=rate_limiter
+                )
+            except Exception as e:
+                logger.error("Failed to send bulk no-data emails: %s", e)
+                errors = [str(e)] * len(no_data_bulk)
+            
+            result_index = {id(result): i for i, result in enumerate(email_results)}
+            for i, (result, _) in enumerate(no_data_bulk):
+                # Only an explicit per-destination success counts as sent
+                error = errors[i] if i < len(errors) else 'No send status returned by SES'
+                if error:
+                    for key in ('recordCount', 'revenue', 'locations', 'emailType'):
+                        result.pop(key, None)
+                    result.update({'status': 'failed', 'error': error})
+                else:
+                    result['status'] = 'success'
+                summary_rows[result_index[id(result)]] = summary_result_row_html(result)
+        
+        for result in email_results:
+            if result['status'] == 'success':
+                emails_sent += 1
+                total_revenue_summary += result.get('revenue', 0)
+                total_records_summary += result.get('recordCount', 0)
+            elif result['status'] == 'failed':
                 emails_failed += 1
-                email_results.append({
-                    'owner': get_owner_display_name(owner),
-                    'email': owner['email'],
-                    'status': 'failed',
-                    'error': str(e),
-                    'templateUsed': owner_template_no,
-                    'timezone': owner_timezone
-                })
+            else:
+                emails_skipped += 1
         
         # Prepare summary data
         summary_data = {
@@ -1393,7 +2240,7 @@ Generated on: {format_now_ist()}"""
         
         # Generate and send summary report to admin email
         try:
-            summary_html = generate_summary_report_html(summary_data, today_str)
+            summary_html = generate_summary_report_html(summary_data, today_str, summary_rows, generated_at)
             summary_text = f"""Daily Reports Summary - {today_str}
 
 Trigger: {trigger_source}
@@ -1404,10 +2251,10 @@ Failed: {emails_failed}
 Skipped: {emails_skipped}
 Total Users: {len(owners) if owners else 0}
 
-Total Revenue: ₹{total_revenue_summary:,}
+Total Revenue: {money(total_revenue_summary)}
 Total Records: {total_records_summary}
 
-Generated on: {format_now_ist()}"""
+Generated on: {generated_at}"""
             
             send_email_with_attachments_ses(
                 from_email,
@@ -1415,15 +2262,16 @@ Generated on: {format_now_ist()}"""
                 f"Daily Reports Summary - {today_str} ({trigger_source})",
                 summary_html,
                 summary_text,
-                []
+                [],
+                rate_limiter=rate_limiter
             )
             
-            logger.info(f"Summary report sent to admin email: {from_email}")
+            logger.info("Summary report sent to admin email: %s", from_email)
         except Exception as e:
-            logger.error(f"Failed to send summary report: {e}")
+            logger.error("Failed to send summary report: %s", e)
         
-        logger.info(f"Daily reports completed. Emails sent: {emails_sent}/{len(owners) if owners else 0}")
-        logger.info(f"Total revenue: ₹{total_revenue_summary:,}, Total records: {total_records_summary}")
+        logger.info("Daily reports completed. Emails sent: %s/%s", emails_sent, len(owners) if owners else 0)
+        logger.info("Total revenue: %s, Total records: %s", money(total_revenue_summary), total_records_summary)
         
         return jsonify({
             'success': True,
@@ -1436,6 +2284,8 @@ Generated on: {format_now_ist()}"""
             'totalOwners': len(owners) if owners else 0,
             'totalRevenue': total_revenue_summary,
             'totalRecords': total_records_summary,
+            'cacheHits': cache_hits,
+            'throttleWaitsMs': round(rate_limiter.waited * 1000),
             'reportDate': today_str,
             'summaryEmailSent': True,
             'summaryEmailTo': from_email,
@@ -1449,7 +2299,7 @@ Generated on: {format_now_ist()}"""
         }), 200
         
     except Exception as err:
-        logger.error(f"Error: {err}", exc_info=True)
+        logger.error("Error: %s", err, exc_info=True)
         return jsonify({
             'success': False,
             'error': str(err),
@@ -1461,6 +2311,18 @@ Generated on: {format_now_ist()}"""
             'templateSource': 'user_schedules table'
         }), 500
 
+@app.route('/reports/status/<job_id>', methods=['GET'])
+def report_job_status(job_id: str):
+    """Status of a background /send-reports run; includes its summary once finished"""
+    auth_error = _authorization_error()
+    if auth_error:
+        return auth_error
+    
+    job = _load_report_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job ID'}), 404
+    return jsonify(job), 200
+
 @app.route('/dev/send-reports', methods=['GET', 'POST'])
 def dev_send_reports():
     """Temporary local-only route to manually test report generation.
@@ -1629,15 +2491,19 @@ def dev_ui():
         """
         return html
 
+# The health body never changes, so it is serialized once instead of per probe
+_HEALTH_BODY = orjson.dumps({
+    'status': 'healthy', 
+    'service': 'daily-reports', 
+    'delivery': 'AWS SES API',
+    'features': 'Multi-location + User scheduling enabled'
+}, option=orjson.OPT_APPEND_NEWLINE)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy', 
-        'service': 'daily-reports', 
-        'delivery': 'AWS SES API',
-        'features': 'Multi-location + User scheduling enabled'
-    }), 200
+    return app.response_class(_HEALTH_BODY, status=200, mimetype='application/json',
+                              headers={'Cache-Control': 'no-store'})
 
 
 if __name__ == '__main__':
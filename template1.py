@@ -2,23 +2,40 @@
 Template 1: Classic Daily Report Email Template
 """
 
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Dict, Any, Optional
+
+
+# Footer timestamps are IST, like the rest of the report
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+_UPI_ACCOUNT_ITEM = "<li style='font-size: 13px;'>{name}: ₹{amount:,} ({count} vehicles)</li>"
 
 
 def generate_template1_html(analysis: Dict[str, Any], location_name: str, 
-                            today_str: str) -> str:
-    """Generate HTML for Template 1 (Classic)"""
+                            today_str: str, generated_at: Optional[str] = None) -> str:
+    """Generate HTML for Template 1 (Classic); generated_at defaults to now, IST"""
+    
+    if generated_at is None:
+        generated_at = datetime.now(IST).strftime("%d/%m/%Y at %H:%M")
+    
+    # Location, mode, service and account names come from user data
+    location_name = escape(str(location_name), quote=False)
     
     # Payment breakdown rows
-    payment_rows = ""
+    payment_rows = []
     for item in analysis['paymentModeBreakdown']:
+        mode = item['mode']
+        upi_accounts = item.get('upiAccounts')
         upi_details = ""
-        if item['mode'].lower() == 'upi' and item.get('upiAccounts'):
-            upi_list = "<ul style='margin: 4px 0; padding-left: 20px;'>"
-            for account_name, account_data in item['upiAccounts'].items():
-                upi_list += f"<li style='font-size: 13px;'>{account_name}: ₹{account_data['amount']:,} ({account_data['count']} vehicles)</li>"
-            upi_list += "</ul>"
+        if upi_accounts and mode.lower() == 'upi':
+            upi_items = "".join(
+                _UPI_ACCOUNT_ITEM.format(name=escape(str(account_name), quote=False), amount=account_data['amount'], count=account_data['count'])
+                for account_name, account_data in upi_accounts.items()
+            )
+            upi_list = f"<ul style='margin: 4px 0; padding-left: 20px;'>{upi_items}</ul>"
             upi_details = f"""
             <tr>
               <td colspan="4" style="padding: 8px 12px; background-color: #f8f9fa; border-bottom: 1px solid #e9ecef;">
@@ -28,52 +45,51 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
             </tr>
             """
         
-        payment_rows += f"""
+        payment_rows.append(f"""
         <tr>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{item['mode']}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{escape(str(mode), quote=False)}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right; font-weight: 600;">₹{item['revenue']:,}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center;">{item['count']}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right;">{item['percentage']:.1f}%</td>
         </tr>
         {upi_details}
-        """
+        """)
     
     # Service breakdown rows
-    service_rows = ""
+    service_rows = []
     for item in analysis['serviceBreakdown']:
-        service_rows += f"""
+        service_rows.append(f"""
         <tr>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{item['service']}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{escape(str(item['service']), quote=False)}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center;">{item['count']}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right; font-weight: 600;">₹{item['revenue']:,}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right;">₹{round(item['price'])}</td>
         </tr>
-        """
+        """)
     
     # Vehicle distribution rows
-    vehicle_rows = ""
+    vehicle_rows = []
     for item in analysis['vehicleDistribution']:
-        vehicle_rows += f"""
+        vehicle_rows.append(f"""
         <tr>
-          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{item['type']}</td>
+          <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{escape(str(item['type']), quote=False)}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center;">{item['count']}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right;">{item['percentage']:.1f}%</td>
         </tr>
-        """
+        """)
     
     # Hourly breakdown rows
-    hourly_rows = ""
+    hourly_rows = []
     for item in analysis['hourlyBreakdown']:
-        hourly_rows += f"""
+        hourly_rows.append(f"""
         <tr>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef;">{item['display']}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: center;">{item['count']}</td>
           <td style="padding: 12px; border-bottom: 1px solid #e9ecef; text-align: right; font-weight: 600;">₹{item['amount']:,}</td>
         </tr>
-        """
+        """)
     
-    return f"""
-<!DOCTYPE html>
+    return f"""<!DOCTYPE html>
 <html>
 <head>
   <meta charset="UTF-8">
@@ -120,7 +136,7 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
             </tr>
           </thead>
           <tbody>
-            {payment_rows}
+            {''.join(payment_rows)}
           </tbody>
         </table>
       </div>
@@ -137,7 +153,7 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
             </tr>
           </thead>
           <tbody>
-            {service_rows}
+            {''.join(service_rows)}
           </tbody>
         </table>
       </div>
@@ -153,7 +169,7 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
             </tr>
           </thead>
           <tbody>
-            {vehicle_rows}
+            {''.join(vehicle_rows)}
           </tbody>
         </table>
       </div>
@@ -169,7 +185,7 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
             </tr>
           </thead>
           <tbody>
-            {hourly_rows}
+            {''.join(hourly_rows)}
           </tbody>
         </table>
       </div>
@@ -184,11 +200,10 @@ def generate_template1_html(analysis: Dict[str, Any], location_name: str,
     
     <div style="background-color: #f8f9fa; padding: 20px 24px; border-top: 1px solid #e9ecef; text-align: center;">
       <p style="margin: 0; color: #6c757d; font-size: 12px;">
-        Report generated on {datetime.now().strftime("%d/%m/%Y at %H:%M")}
+        Report generated on {generated_at}
       </p>
     </div>
     
   </div>
 </body>
-</html>
-    """.strip()
\ No newline at end of file
+</html>"""
\ No newline at end of file
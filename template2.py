@@ -6,38 +6,48 @@ Generates charts as images, attaches them as CIDs, and returns HTML ready for SE
 import matplotlib
 matplotlib.use('Agg')  # Non-GUI backend for server environments
 
-from datetime import datetime
-from typing import Dict, Any, List
-import matplotlib.pyplot as plt
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Dict, Any, List, Optional
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
 import io
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 
+# Footer timestamps are IST, like the rest of the report
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
 def plot_bar_chart(labels: List[str], values: List[int], title: str, color: str = '#667eea') -> io.BytesIO:
     """Generate high-quality bar chart as BytesIO object"""
-    fig, ax = plt.subplots(figsize=(8, 5), dpi=100)
+    # Figure objects (not pyplot) so charts can render from worker threads
+    fig = Figure(figsize=(8, 5), dpi=100)
+    ax = fig.subplots()
     ax.bar(labels, values, color=color, edgecolor='white', linewidth=1.5)
     ax.set_title(title, fontsize=14, fontweight='bold', pad=15)
     ax.set_ylabel('Revenue (₹)', fontsize=11, fontweight='bold')
     ax.grid(axis='y', linestyle='--', alpha=0.4, zorder=0)
     ax.set_axisbelow(True)
-    plt.xticks(rotation=30, ha='right', fontsize=10)
-    plt.yticks(fontsize=10)
+    ax.tick_params(axis='x', labelrotation=30, labelsize=10)
+    ax.tick_params(axis='y', labelsize=10)
+    for tick_label in ax.get_xticklabels():
+        tick_label.set_horizontalalignment('right')
     
     # Format y-axis with comma separators
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{int(x):,}'))
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'₹{int(x):,}'))
     
     buf = io.BytesIO()
     fig.tight_layout()
     fig.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='white')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
 def plot_doughnut_chart(labels: List[str], values: List[int], title: str, colors: List[str] = None) -> io.BytesIO:
     """Generate high-quality doughnut chart as BytesIO object"""
-    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
+    fig = Figure(figsize=(7, 5), dpi=100)
+    ax = fig.subplots()
     if colors is None:
         colors = ['#667eea', '#764ba2', '#f093fb', '#f5576c', '#4facfe', '#00f2fe']
     
@@ -63,15 +73,18 @@ def plot_doughnut_chart(labels: List[str], values: List[int], title: str, colors
     fig.tight_layout()
     fig.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='white')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
-def generate_template2_email(analysis: Dict[str, Any], location_name: str, today_str: str) -> MIMEMultipart:
+def generate_template2_email(analysis: Dict[str, Any], location_name: str, today_str: str,
+                             generated_at: Optional[str] = None) -> MIMEMultipart:
     """
     Returns MIMEMultipart email object ready to send via SES with CID charts.
-    Uses multipart/related for inline images.
+    Uses multipart/related for inline images. generated_at defaults to now, IST.
     """
+    if generated_at is None:
+        generated_at = datetime.now(IST).strftime("%d/%m/%Y at %H:%M")
     msg = MIMEMultipart('related')
+    location_html = escape(str(location_name), quote=False)
     
     # Create HTML body with CID references
     html_body = f"""
@@ -88,7 +101,7 @@ def generate_template2_email(analysis: Dict[str, Any], location_name: str, today
         <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 32px 24px; text-align: center;">
             <h1 style="margin: 0; font-size: 32px; font-weight: 700;">📊 Daily Business Report</h1>
             <p style="margin: 8px 0 0 0; font-size: 16px; opacity: 0.95;">📅 {today_str}</p>
-            <p style="margin: 4px 0 0 0; font-size: 14px; opacity: 0.85;">📍 {location_name}</p>
+            <p style="margin: 4px 0 0 0; font-size: 14px; opacity: 0.85;">📍 {location_html}</p>
         </div>
         
         <!-- Summary Stats -->
@@ -161,7 +174,7 @@ def generate_template2_email(analysis: Dict[str, Any], location_name: str, today
         <!-- Footer -->
         <div style="background: #f8f9fa; padding: 20px 24px; text-align: center; border-top: 1px solid #dee2e6;">
             <p style="margin: 0; color: #6c757d; font-size: 12px;">
-                Report generated on {datetime.now().strftime("%d/%m/%Y at %H:%M")}
+                Report generated on {generated_at}
             </p>
         </div>
         
@@ -6,24 +6,34 @@ Generates BI-style charts as images and embeds them in the email via CID.
 import matplotlib
 matplotlib.use('Agg')  # Non-GUI backend for server environments
 
-from datetime import datetime
-from typing import Dict, Any, List
-import matplotlib.pyplot as plt
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Dict, Any, List, Optional
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
 import io
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 
+# Footer timestamps are IST, like the rest of the report
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
 def plot_bar_chart(labels: List[str], values: List[int], title: str, color: str = '#667eea') -> io.BytesIO:
     """Generate high-quality bar chart"""
-    fig, ax = plt.subplots(figsize=(8, 5), dpi=100)
+    # Figure objects (not pyplot) so charts can render from worker threads
+    fig = Figure(figsize=(8, 5), dpi=100)
+    ax = fig.subplots()
     bars = ax.bar(labels, values, color=color, edgecolor='white', linewidth=2)
     ax.set_title(title, fontsize=14, fontweight='bold', pad=15)
     ax.set_ylabel('Revenue (₹)', fontsize=11, fontweight='bold')
     ax.grid(axis='y', linestyle='--', alpha=0.3, zorder=0)
     ax.set_axisbelow(True)
-    plt.xticks(rotation=30, ha='right', fontsize=10)
-    plt.yticks(fontsize=10)
+    ax.tick_params(axis='x', labelrotation=30, labelsize=10)
+    ax.tick_params(axis='y', labelsize=10)
+    for tick_label in ax.get_xticklabels():
+        tick_label.set_horizontalalignment('right')
     
     # Add value labels on bars
     for bar in bars:
@@ -34,18 +44,18 @@ def plot_bar_chart(labels: List[str], values: List[int], title: str, color: str
                    ha='center', va='bottom', fontsize=9, fontweight='bold')
     
     # Format y-axis
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{int(x):,}'))
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'₹{int(x):,}'))
     
     buf = io.BytesIO()
     fig.tight_layout()
     fig.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='white')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
 def plot_doughnut_chart(labels: List[str], values: List[int], title: str, colors: List[str] = None) -> io.BytesIO:
     """Generate high-quality doughnut chart"""
-    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)
+    fig = Figure(figsize=(7, 5), dpi=100)
+    ax = fig.subplots()
     if colors is None:
         colors = ['#667eea', '#f093fb', '#4facfe', '#43e97b', '#ff6b6b', '#feca57']
     
@@ -72,19 +82,21 @@ def plot_doughnut_chart(labels: List[str], values: List[int], title: str, colors
     fig.tight_layout()
     fig.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor='white')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
-def generate_template3_email(analysis: Dict[str, Any], location_name: str, today_str: str) -> MIMEMultipart:
+def generate_template3_email(analysis: Dict[str, Any], location_name: str, today_str: str,
+                             generated_at: Optional[str] = None) -> MIMEMultipart:
     """
     Returns MIMEMultipart email object for Template 3 with all charts embedded via CID.
-    Professional Business Intelligence style.
+    Professional Business Intelligence style. generated_at defaults to now, IST.
     """
+    if generated_at is None:
+        generated_at = datetime.now(IST).strftime("%d/%m/%Y at %H:%M")
     msg = MIMEMultipart('related')
 
     peak_hour = analysis['summary']['peakHour']
     peak_revenue = analysis['summary']['peakHourRevenue']
-    top_service = analysis['insights']['topService']
+    top_service = escape(str(analysis['insights']['topService']), quote=False)
     top_service_revenue = analysis['insights']['topServiceRevenue']
 
     # HTML with modern BI styling and CID placeholders
@@ -103,7 +115,7 @@ def generate_template3_email(analysis: Dict[str, Any], location_name: str, today
             <div style="display: flex; align-items: center; justify-content: space-between;">
                 <div>
                     <h1 style="margin: 0; font-size: 32px; font-weight: 700;">📈 Business Intelligence Report</h1>
-                    <p style="margin: 12px 0 0 0; font-size: 18px; opacity: 0.95; font-weight: 500;">{today_str} • {location_name}</p>
+                    <p style="margin: 12px 0 0 0; font-size: 18px; opacity: 0.95; font-weight: 500;">{today_str} • {escape(str(location_name), quote=False)}</p>
                 </div>
             </div>
         </div>
@@ -226,7 +238,7 @@ def generate_template3_email(analysis: Dict[str, Any], location_name: str, today
                 📎 This report includes 3 CSV attachments with detailed analytics
             </p>
             <p style="margin: 0; color: #adb5bd; font-size: 12px;">
-                Report generated on {datetime.now().strftime("%d/%m/%Y at %H:%M")} • Powered by Business Intelligence System
+                Report generated on {generated_at} • Powered by Business Intelligence System
             </p>
         </div>
 